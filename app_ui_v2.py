@@ -14,13 +14,17 @@ Run this script with `streamlit run app_ui_v2_enhanced.py` to launch the app.
 """
 
 import io
+import hashlib
+import inspect
+from collections import OrderedDict
+from operator import itemgetter
 import numpy as np
 import pandas as pd
+import pyarrow as pa
 import streamlit as st
-import matplotlib.pyplot as plt
 from lpa_v50_v4 import (
     Spudcan, SoilPoint, SoilLayer,
-    compute_envelopes, penetration_results,
+    compute_envelopes_and_pen,
     USE_MIN_CU_POINT_AVG_DEFAULT, APPLY_PHI_REDUCTION_DEFAULT,
     APPLY_WINDWARD_FACTOR_DEFAULT, APPLY_SQUEEZE_TRIGGER_DEFAULT,
 )
@@ -37,6 +41,20 @@ except ImportError:
     ENHANCED_PLOTTING_AVAILABLE = False
     st.warning("Enhanced plotting module not found. Using basic plotting.")
 
+def _matplotlib():
+    """
+    matplotlib, imported on first use: nothing is plotted until an analysis has
+    run. Figures are built as bare matplotlib.figure.Figure objects, so pyplot
+    (the slowest import, plus a global figure registry that needs plt.close())
+    is never loaded.
+    """
+    import matplotlib
+    # Fine dz / deep dmax runs give thousands of vertices per curve; let Agg merge
+    # segments that deviate by less than a pixel.
+    matplotlib.rcParams["path.simplify"] = True
+    matplotlib.rcParams["path.simplify_threshold"] = 1.0
+    return matplotlib
+
 st.set_page_config(
     page_title="spud-SRI V5 / Leg Penetration (SNAME)",
     page_icon="💎",
@@ -45,52 +63,66 @@ st.set_page_config(
 st.title("spud-SRI · Leg Penetration (SNAME) · Version 5.6")
 st.caption("✨ Upgraded with zero-load tip penetration, advanced Nc', and flexible soil profile input")
 
+# Inputs are batched in forms: editing a field no longer reruns the script,
+# changes are applied together on submit.
 with st.sidebar:
-    st.subheader("Analysis switches")
-    use_min_cu = st.checkbox("Use min(Su point, Su B/2 avg)", value=USE_MIN_CU_POINT_AVG_DEFAULT,
-                             help="Conservative default for undrained strength.")
-    phi_reduce = st.checkbox("Apply 5° reduction to ϕ′", value=APPLY_PHI_REDUCTION_DEFAULT,
-                             help="Optional conservatism for sands.")
-    windward80 = st.checkbox("Windward factor 0.8 on REAL", value=APPLY_WINDWARD_FACTOR_DEFAULT,
-                             help="Applies 0.8 to the governing REAL capacity only.")
-    squeeze_trig = st.checkbox("Enforce squeezing geometric trigger", value=APPLY_SQUEEZE_TRIGGER_DEFAULT)
-    
-    st.divider()
-    st.subheader("Analysis parameters")
-    dz = st.number_input("Depth step Δz (m)", value=0.25, min_value=0.05, max_value=2.0, step=0.05)
-    dmax = st.number_input("Max analysis depth (m)", value=30.0, min_value=5.0, max_value=200.0, step=1.0)
+    with st.form("analysis_settings"):
+        st.subheader("Analysis switches")
+        use_min_cu = st.checkbox("Use min(Su point, Su B/2 avg)", value=USE_MIN_CU_POINT_AVG_DEFAULT,
+                                 help="Conservative default for undrained strength.")
+        phi_reduce = st.checkbox("Apply 5° reduction to ϕ′", value=APPLY_PHI_REDUCTION_DEFAULT,
+                                 help="Optional conservatism for sands.")
+        windward80 = st.checkbox("Windward factor 0.8 on REAL", value=APPLY_WINDWARD_FACTOR_DEFAULT,
+                                 help="Applies 0.8 to the governing REAL capacity only.")
+        squeeze_trig = st.checkbox("Enforce squeezing geometric trigger", value=APPLY_SQUEEZE_TRIGGER_DEFAULT)
+        
+        st.divider()
+        st.subheader("Analysis parameters")
+        dz = st.number_input("Depth step Δz (m)", value=0.25, min_value=0.05, max_value=2.0, step=0.05)
+        dmax = st.number_input("Max analysis depth (m)", value=30.0, min_value=5.0, max_value=200.0, step=1.0)
+        st.form_submit_button("Apply settings")
 
 st.markdown("#### Spudcan inputs")
-cols = st.columns(5)
-rig = cols[0].text_input("Rig name", "Rig-1")
-B   = cols[1].number_input("Diameter B (m)", value=8.0, min_value=0.1, step=0.1)
-A   = cols[2].number_input("Area A (m²)", value=float(np.pi*(B**2)/4.0), min_value=0.01, step=0.1,
-                           help="Projected area of widest section. Defaults to πB²/4.")
-tip = cols[3].number_input("Tip elevation (m)", value=1.5, min_value=0.0, step=0.1,
-                           help="Distance from tip to widest section; added to analysis depth for tip penetration.")
-Pmn = cols[4].number_input("Preload per leg (MN)", value=80.0, min_value=1.0, step=1.0)
-
-# NEW: Advanced Nc' parameters (Upgrade 2)
-st.markdown("##### 🆕 Advanced Nc' parameters (optional)")
-with st.expander("Configure advanced bearing capacity factors (SNAME Tables C6.1-C6.6)", expanded=False):
-    st.markdown("""
-    **When to use:** For more accurate bearing capacity prediction in normally consolidated clays.
-    
-    **Parameters:**
-    - **β (Beta)**: Spudcan equivalent cone angle
-    - **α (Alpha)**: Surface roughness factor (0.0 = fully smooth, 1.0 = fully rough)
-    
-    **Calculated automatically:**
-    - **D/2R**: Embedment depth ratio at each analysis depth
-    - **ρ2R/c_um**: Strength gradient parameter from your Su profile
-    
-    Leave unchecked to use the default Nc = 5.14 approach.
-    """)
-    
-    use_advanced_nc = st.checkbox("Enable advanced Nc' calculation", value=False,
-                                 help="Uses SNAME Tables C6.1-C6.6 for bearing capacity factors")
+# A follows πB²/4 until the user enters a different area. It is seeded through
+# session state rather than a B-dependent `value=`, which gave the widget a new
+# identity (and reset it) on every change of B.
+_default_A = float(np.pi * st.session_state.get("spud_B", 8.0)**2 / 4.0)
+if "spud_A" not in st.session_state or st.session_state["spud_A"] == st.session_state.get("_spud_A_default"):
+    st.session_state["spud_A"] = _default_A
+st.session_state["_spud_A_default"] = _default_A
+
+with st.form("spudcan_inputs"):
+    cols = st.columns(5)
+    rig = cols[0].text_input("Rig name", "Rig-1")
+    B   = cols[1].number_input("Diameter B (m)", value=8.0, min_value=0.1, step=0.1, key="spud_B")
+    A   = cols[2].number_input("Area A (m²)", min_value=0.01, step=0.1, key="spud_A",
+                               help="Projected area of widest section. Defaults to πB²/4.")
+    tip = cols[3].number_input("Tip elevation (m)", value=1.5, min_value=0.0, step=0.1,
+                               help="Distance from tip to widest section; added to analysis depth for tip penetration.")
+    Pmn = cols[4].number_input("Preload per leg (MN)", value=80.0, min_value=1.0, step=1.0)
+
+    # NEW: Advanced Nc' parameters (Upgrade 2)
+    st.markdown("##### 🆕 Advanced Nc' parameters (optional)")
+    with st.expander("Configure advanced bearing capacity factors (SNAME Tables C6.1-C6.6)", expanded=False):
+        st.markdown("""
+        **When to use:** For more accurate bearing capacity prediction in normally consolidated clays.
     
-    if use_advanced_nc:
+        **Parameters:**
+        - **β (Beta)**: Spudcan equivalent cone angle
+        - **α (Alpha)**: Surface roughness factor (0.0 = fully smooth, 1.0 = fully rough)
+    
+        **Calculated automatically:**
+        - **D/2R**: Embedment depth ratio at each analysis depth
+        - **ρ2R/c_um**: Strength gradient parameter from your Su profile
+    
+        Leave unchecked to use the default Nc = 5.14 approach.
+        """)
+    
+        use_advanced_nc = st.checkbox("Enable advanced Nc' calculation", value=False,
+                                     help="Uses SNAME Tables C6.1-C6.6 for bearing capacity factors")
+    
+        # β/α are always shown: widgets inside a form can't appear conditionally
+        # before submit. They are only used when the checkbox above is ticked.
         col_beta, col_alpha = st.columns(2)
         
         with col_beta:
@@ -100,9 +132,9 @@ with st.expander("Configure advanced bearing capacity factors (SNAME Tables C6.1
                 index=2,  # default to 90°
                 help="Equivalent cone angle of spudcan. For multi-cone spudcans, use equivalent single cone."
             )
-            
-            st.caption("**Guidance:** Flat spudcan=180°, typical=90-120°, sharp=30-60°")
         
+            st.caption("**Guidance:** Flat spudcan=180°, typical=90-120°, sharp=30-60°")
+    
         with col_alpha:
             alpha = st.slider(
                 "Roughness α",
@@ -112,272 +144,557 @@ with st.expander("Configure advanced bearing capacity factors (SNAME Tables C6.1
                 step=0.1,
                 help="Surface roughness: 0.0=smooth, 1.0=fully rough. Typical 'double cone' spudcans ≈ 0.4"
             )
-            
+        
             st.caption("**Guidance:** Smooth=0.0-0.2, typical=0.4, rough=0.8-1.0")
-    else:
-        beta_deg = None
-        alpha = None
 
-spud = Spudcan(rig_name=rig, B=B, A=A, tip_elev=tip, preload_MN=Pmn,
-               beta=beta_deg, alpha=alpha)
+    st.form_submit_button("Apply spudcan inputs")
+
+if not use_advanced_nc:
+    beta_deg = None
+    alpha = None
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def _make_spudcan(rig, B, A, tip, Pmn, beta, alpha) -> Spudcan:
+    """
+    Spudcan for a given input tuple; reruns with unchanged fields reuse the
+    instance. Shared, so treat it as read-only.
+    """
+    return Spudcan(rig_name=rig, B=B, A=A, tip_elev=tip, preload_MN=Pmn,
+                   beta=beta, alpha=alpha)
+
+spud = _make_spudcan(rig, B, A, tip, Pmn, beta_deg, alpha)
 
 # Define helper functions at module level
-def _parse_pairs(s: str):
-    """Parse string pairs like '0,10.0; 2,10.0' into SoilPoint list."""
+
+# numpy < 2 only warns when np.fromstring stops at unparseable text and returns
+# what it read so far ('0,10;;2,20' -> [0, 10]), so it is used on numpy 2+ only
+_FROMSTRING_STRICT = np.lib.NumpyVersion(np.__version__) >= "2.0.0"
+
+def _parse_pairs_arr(s: str) -> np.ndarray:
+    """Parse string pairs like '0,10.0; 2,10.0' into an (N, 2) depth/value array."""
     s = (s or "").strip()
-    if not s:
-        return []
-    pts = []
-    for tok in s.split(";"):
-        tok = tok.strip()
-        if not tok:
-            continue
-        d, v = tok.split(",")
-        pts.append(SoilPoint(float(d.strip()), float(v.strip())))
-    return pts
+    # Pair structure first: every non-empty ';' token must be exactly 'depth,value'
+    tokens = [tok for tok in s.split(";") if tok.strip()]
+    if not tokens:
+        return np.empty((0, 2))
+    if any(tok.count(",") != 1 for tok in tokens):
+        raise ValueError(f"Expected 'depth,value' pairs separated by ';' in '{s}'")
+    text = ",".join(tokens)
+    arr = None
+    if _FROMSTRING_STRICT:
+        # Convert in numpy's C parser; whitespace around separators is fine
+        try:
+            arr = np.fromstring(text, sep=",")
+        except ValueError:
+            pass
+    if arr is None or arr.size != 2 * len(tokens):
+        # Token path: reports the empty or non-numeric field
+        arr = np.array(text.split(","), dtype=float)
+    return arr.reshape(-1, 2)
+
+def _pairs_cached(s: str) -> np.ndarray:
+    """
+    _parse_pairs_arr() memoised per session on the raw string (result is
+    read-only). functools.lru_cache would never hit here: the script, and every
+    function defined in it, is re-executed on each rerun.
+    """
+    memo = st.session_state.setdefault("_parsed_pairs", {})
+    arr = memo.get(s)
+    if arr is None:
+        arr = _parse_pairs_arr(s)
+        arr.setflags(write=False)
+        if len(memo) > 512:
+            memo.clear()
+        memo[s] = arr
+    return arr
+
+def _layer_from_row(L: dict) -> SoilLayer:
+    """
+    SoilLayer for one simple-builder row. Parsed layers are memoised on the row's
+    field values, and pair strings on their text, so a run only re-parses the
+    pair fields that changed.
+    """
+    parsed = st.session_state.setdefault("_parsed_layers", {})
+    sig = (L["name"], float(L["z_top"]), float(L["z_bot"]), L["type"],
+           L["gamma_pairs"], L["su_pairs"], L["phi_pairs"])
+    if sig in parsed:
+        return parsed[sig]
+    layer = SoilLayer.from_arrays(
+        name=L["name"],
+        z_top=L["z_top"],
+        z_bot=L["z_bot"],
+        soil_type=L["type"],
+        gamma=_pairs_cached(L["gamma_pairs"]),
+        su=_pairs_cached(L["su_pairs"]),
+        phi=_pairs_cached(L["phi_pairs"]),
+    )
+    if len(parsed) > 256:
+        parsed.clear()
+    parsed[sig] = layer
+    return layer
+
+def _default_points(z_top, z_bot, v_top, v_bot):
+    return [SoilPoint(z_top, v_top), SoilPoint(z_bot, v_bot)]
 
 def _convert_to_layers(layers_data):
     """Convert layer data to SoilLayer objects (compatible with existing code)."""
     
-    soil_layers = []
-    
-    for data in layers_data:
-        # Ensure we have at least some data points
-        gamma_points = data.get('gamma_points', [])
-        su_points = data.get('su_points', [])
-        phi_points = data.get('phi_points', [])
-        
-        # If no gamma points, add default linear profile
-        if not gamma_points:
-            gamma_points = [
-                SoilPoint(data['z_top'], 7.0),
-                SoilPoint(data['z_bot'], 8.0)
-            ]
-        
-        # If clay/silt and no su points, add default
-        if data['type'] in ['clay', 'silt'] and not su_points:
-            su_points = [
-                SoilPoint(data['z_top'], 20.0),
-                SoilPoint(data['z_bot'], 40.0)
-            ]
-        
-        # If sand and no phi points, add default
-        if data['type'] == 'sand' and not phi_points:
-            phi_points = [
-                SoilPoint(data['z_top'], 30.0),
-                SoilPoint(data['z_bot'], 32.0)
-            ]
-        
-        # Create SoilLayer object
-        layer = SoilLayer(
-            name=data['name'],
-            z_top=data['z_top'],
-            z_bot=data['z_bot'],
-            soil_type=data['type'],
-            gamma=gamma_points,
-            su=su_points,
-            phi=phi_points
+    # Single pass over the rows; placeholder linear profiles fill any parameter
+    # the layer type needs but has no points for:
+    #   γ' 7 -> 8 kN/m³ (all), Su 20 -> 40 kPa (clay/silt), φ' 30° -> 32° (sand)
+    return [
+        SoilLayer(
+            name=d['name'],
+            z_top=d['z_top'],
+            z_bot=d['z_bot'],
+            soil_type=d['type'],
+            gamma=d.get('gamma_points') or _default_points(d['z_top'], d['z_bot'], 7.0, 8.0),
+            su=(d.get('su_points') or
+                (_default_points(d['z_top'], d['z_bot'], 20.0, 40.0) if d['type'] in ('clay', 'silt') else [])),
+            phi=(d.get('phi_points') or
+                 (_default_points(d['z_top'], d['z_bot'], 30.0, 32.0) if d['type'] == 'sand' else [])),
         )
-        
-        soil_layers.append(layer)
+        for d in layers_data
+    ]
+
+# ============= Cached engine calls =============
+# Streamlit reruns the whole script on every widget interaction, so the engine
+# calls are memoised on hashable fingerprints of their inputs.
+def _spud_key(spud: Spudcan) -> tuple:
+    """Hashable fingerprint of a Spudcan (field order matches the dataclass)."""
+    return (spud.rig_name, spud.B, spud.A, spud.tip_elev, spud.preload_MN, spud.beta, spud.alpha)
+
+def _layers_key(layers) -> tuple:
+    """Hashable fingerprint of a SoilLayer list, with points as (z, v) tuples."""
+    return tuple(
+        (L.name, L.z_top, L.z_bot, L.soil_type,
+         tuple((p.z, p.v) for p in L.gamma),
+         tuple((p.z, p.v) for p in L.su),
+         tuple((p.z, p.v) for p in L.phi))
+        for L in layers
+    )
+
+def _layers_from_key(layers_key):
+    """Rebuild SoilLayer objects from a _layers_key() fingerprint."""
+    return [
+        SoilLayer(name=name, z_top=z_top, z_bot=z_bot, soil_type=soil_type,
+                  gamma=[SoilPoint(z, v) for z, v in gamma],
+                  su=[SoilPoint(z, v) for z, v in su],
+                  phi=[SoilPoint(z, v) for z, v in phi])
+        for name, z_top, z_bot, soil_type, gamma, su, phi in layers_key
+    ]
+
+# Each entry holds a full results frame; bound the cache so long sessions with
+# many parameter sweeps don't grow memory without limit.
+ANALYSIS_CACHE_ENTRIES = 32
+
+@st.cache_data(show_spinner=False, ttl=3600, max_entries=ANALYSIS_CACHE_ENTRIES)
+def _analysis_cached(spud_key, layers_key, dmax, dz, use_min_cu, phi_reduction,
+                     windward_factor, squeeze_trigger):
+    """compute_envelopes_and_pen() keyed on primitives; unchanged reruns skip the depth sweep."""
+    return compute_envelopes_and_pen(
+        spud=Spudcan(*spud_key),
+        layers=_layers_from_key(layers_key),
+        max_depth=dmax,
+        dz=dz,
+        use_min_cu=use_min_cu,
+        phi_reduction=phi_reduction,
+        windward_factor=windward_factor,
+        squeeze_trigger=squeeze_trigger,
+        meyerhof_table=None,
+    )
+
+def _plot_key(df_hash: str, *extra) -> int:
+    """
+    Figure cache key: the run's frame fingerprint (computed once per Run, see
+    _frame_fingerprint) plus any scalar plot inputs, so a rerun that only redraws
+    never re-hashes the results frame.
+    """
+    return hash((df_hash, *extra))
+
+# On-screen figures are rasterised at screen resolution (Agg cost grows with dpi²);
+# the high-res PNG is only rendered when the user asks for it.
+VIEW_DPI = 100
+EXPORT_DPI = 220
+
+def _fig_png(fig, dpi: int) -> bytes:
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=dpi, bbox_inches="tight")
+    return buf.getvalue()
+
+PLOT_CACHE_SIZE = 8
+
+def _full_width(element) -> dict:
+    """
+    Keyword argument that makes a Streamlit element fill the container width.
+    Current Streamlit takes width="stretch" and deprecates use_container_width;
+    releases before that only know use_container_width (st.image: from 1.40,
+    use_column_width before it).
+    """
+    params = inspect.signature(element).parameters
+    width = params.get("width")
+    if width is not None and (isinstance(width.default, str) or "Width" in str(width.annotation)):
+        return {"width": "stretch"}
+    if "use_container_width" in params:
+        return {"use_container_width": True}
+    return {"use_column_width": True}
+
+_IMAGE_FULL_WIDTH = _full_width(st.image)
+_EDITOR_FULL_WIDTH = _full_width(st.data_editor)
+_TABLE_FULL_WIDTH = _full_width(st.dataframe)
+
+# Simple layer builder grid columns (one row per layer)
+SIMPLE_LAYER_COLUMNS = ["name", "z_top", "z_bot", "type", "gamma_pairs", "su_pairs", "phi_pairs"]
+
+# Enhanced editor soil types, with their selectbox positions
+ENHANCED_SOIL_TYPES = ("clay", "silt", "sand")
+_ENHANCED_TYPE_INDEX = {t: i for i, t in enumerate(ENHANCED_SOIL_TYPES)}
+
+# Default detailed-table projection (the full frame is one checkbox away)
+TABLE_COLUMNS = ["depth", "idle_clay_MN", "idle_sand_MN", "real_MN", "gov"]
+
+def _show_figure(slot: str, key: int, build_fig, file_name: str = "penetration_curve.png"):
+    """
+    Display a Matplotlib figure, skipping the build and Agg rasterisation when
+    this slot has already been rendered for the same key. The last
+    PLOT_CACHE_SIZE PNGs are kept in session state (LRU), so flipping back to
+    earlier inputs is also a hit. A high-res PNG for download is rendered on
+    demand and cached alongside.
+    """
+    cache = st.session_state.setdefault("_plot_cache", OrderedDict())
+    entry = cache.get((slot, key))
+    if entry is None:
+        fig = build_fig()
+        entry = {"view": _fig_png(fig, VIEW_DPI), "export": None}
+        cache[(slot, key)] = entry
+        while len(cache) > PLOT_CACHE_SIZE:
+            cache.popitem(last=False)
+    else:
+        cache.move_to_end((slot, key))
+    st.image(entry["view"], **_IMAGE_FULL_WIDTH)
+
+    if entry["export"] is None:
+        if st.button("🖼️ Prepare high-res PNG", key=f"hires_{slot}"):
+            fig = build_fig()
+            entry["export"] = _fig_png(fig, EXPORT_DPI)
+    if entry["export"] is not None:
+        st.download_button("Download high-res PNG", data=entry["export"], file_name=file_name,
+                           mime="image/png", key=f"dl_{slot}")
+
+def _frame_fingerprint(df: pd.DataFrame) -> str:
+    """Short content hash of a results frame (computed once per analysis run)."""
+    return hashlib.blake2b(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes(),
+                           digest_size=8).hexdigest()
+
+@st.cache_data(show_spinner=False, ttl=3600, max_entries=ANALYSIS_CACHE_ENTRIES)
+def _df_to_csv_bytes(df_hash: str, _df: pd.DataFrame) -> bytes:
+    """
+    CSV download payload, serialised once per distinct results table. Keyed on
+    the precomputed fingerprint; `_df` is excluded from Streamlit's arg hashing.
+    """
+    # Written straight into a bytes buffer: no intermediate full-size str to encode
+    buf = io.BytesIO()
+    _df.to_csv(buf, index=False, encoding="utf-8")
+    return buf.getvalue()
+
+def _layer_summary_frame(layers_data) -> pd.DataFrame:
+    """
+    One-row-per-layer overview (name, type, depth range, point counts), built
+    column-wise. Su/φ' counts show '—' where the layer type doesn't use them.
+    """
+    n = len(layers_data)
+    # One pass pulls all four fields per layer
+    names, types, z_tops, z_bots = (zip(*map(itemgetter('name', 'type', 'z_top', 'z_bot'), layers_data))
+                                    if n else ((), (), (), ()))
+    types = np.array(types, dtype=object)
+
+    def counts(param):
+        return np.fromiter((len(d.get(param) or []) for d in layers_data), dtype=np.int32, count=n)
+
+    return pd.DataFrame({
+        '#': np.arange(1, n + 1),
+        'Name': list(names),
+        'Type': types,
+        'Depths': [f"{zt:.1f}-{zb:.1f}m" for zt, zb in zip(z_tops, z_bots)],
+        'γ\' points': counts('gamma_points'),
+        'Su points': np.where(np.isin(types, ['clay', 'silt']), counts('su_points').astype(str), '—'),
+        'φ\' points': np.where(types == 'sand', counts('phi_points').astype(str), '—'),
+    })
+
+# Layer edits in the enhanced editor rerun only the editor (st.fragment,
+# Streamlit >= 1.37) instead of the whole script including the results block.
+if hasattr(st, "fragment"):
+    _input_fragment = st.fragment
+else:
+    def _input_fragment(func):
+        return func
+
+def _points_editor(points, key: str, value_label: str, z_default: float, v_default: float) -> list:
+    """
+    Edit a layer's (depth, value) points in one st.data_editor grid and return
+    them as SoilPoints sorted by depth. Like the simple builder, the grid is
+    opened on a snapshot (`_pts_base`) and its own edit state sits on top; the
+    snapshot is retaken whenever the grid was not on screen in the last run.
+    """
+    bases = st.session_state.setdefault('_pts_base', {})
+    if key not in st.session_state or key not in bases:
+        bases[key] = [(p.z, p.v) for p in points]
+    edited = st.data_editor(
+        pd.DataFrame(np.array(bases[key], dtype=float).reshape(-1, 2), columns=['z', 'v']),
+        key=key,
+        num_rows="dynamic",
+        hide_index=True,
+        **_EDITOR_FULL_WIDTH,
+        column_config={
+            'z': st.column_config.NumberColumn("Depth (m)", step=0.5, default=z_default, required=True),
+            'v': st.column_config.NumberColumn(value_label, default=v_default, required=True),
+        },
+    )
+    arr = edited.dropna().to_numpy(dtype=float)
+    arr = arr[np.argsort(arr[:, 0], kind='stable')]
+    return [SoilPoint(z, v) for z, v in arr.tolist()]
+
+def _reset_point_editors():
+    """Re-open every points grid on the stored points (after programmatic edits)."""
+    st.session_state.pts_editor_ver = st.session_state.get('pts_editor_ver', 0) + 1
+    st.session_state._pts_base = {}
+
+# Button callbacks for the enhanced editor. They run before the (fragment) rerun
+# the click triggers, so the editor renders the new state without a second rerun.
+def _add_enhanced_layer():
+    layers = st.session_state.soil_layers_enhanced
+    z_top = layers[-1]['z_bot'] if layers else 0.0
+    layers.append({
+        'name': f"Layer {len(layers)+1}",
+        'type': 'clay',
+        'z_top': z_top,
+        'z_bot': z_top + 10.0,
+        'gamma_points': [],
+        'su_points': [],
+        'phi_points': []
+    })
+    st.session_state.active_layer_enh = len(layers) - 1
+
+def _delete_enhanced_layer(idx: int):
+    st.session_state.soil_layers_enhanced.pop(idx)
+    _reset_point_editors()
+
+def _autofill_enhanced_layer(idx: int):
+    """Fill empty parameters of a layer with a linear top/bottom profile."""
+    layer = st.session_state.soil_layers_enhanced[idx]
+    if not layer.get('gamma_points'):
+        layer['gamma_points'] = [
+            SoilPoint(layer['z_top'], 7.0),
+            SoilPoint(layer['z_bot'], 8.0)
+        ]
     
-    return soil_layers
+    if layer['type'] in ['clay', 'silt'] and not layer.get('su_points'):
+        layer['su_points'] = [
+            SoilPoint(layer['z_top'], 20.0),
+            SoilPoint(layer['z_bot'], 50.0)
+        ]
+    elif layer['type'] == 'sand' and not layer.get('phi_points'):
+        layer['phi_points'] = [
+            SoilPoint(layer['z_top'], 30.0),
+            SoilPoint(layer['z_bot'], 35.0)
+        ]
+    _reset_point_editors()
+
+def _clear_enhanced_layers():
+    st.session_state.soil_layers_enhanced = []
+    _reset_point_editors()
 
+@_input_fragment
 def _enhanced_interactive_input():
     """Enhanced interactive table input - allows multiple data points per parameter."""
     
     # Initialize session state for advanced input
     if 'soil_layers_enhanced' not in st.session_state:
         st.session_state.soil_layers_enhanced = []
+    # Callbacks replace/mutate the list before the script runs, so one lookup
+    # per run is safe; edits below mutate the same list object in place.
+    layers = st.session_state.soil_layers_enhanced
     
     # Add new layer button
     col1, col2 = st.columns([1, 3])
     with col1:
-        if st.button("➕ Add New Layer", use_container_width=True, type="primary"):
-            st.session_state.soil_layers_enhanced.append({
-                'name': f"Layer {len(st.session_state.soil_layers_enhanced)+1}",
-                'type': 'clay',
-                'z_top': 0.0 if not st.session_state.soil_layers_enhanced else st.session_state.soil_layers_enhanced[-1]['z_bot'],
-                'z_bot': (0.0 if not st.session_state.soil_layers_enhanced else st.session_state.soil_layers_enhanced[-1]['z_bot']) + 10.0,
-                'gamma_points': [],
-                'su_points': [],
-                'phi_points': []
-            })
-            st.rerun()
+        st.button("➕ Add New Layer", use_container_width=True, type="primary",
+                  on_click=_add_enhanced_layer)
+    
+    # Only the selected layer gets the full editor; the Profile Summary table
+    # below covers the rest, so widget count no longer grows with layer count.
+    n_layers = len(layers)
+    active_idx = None
+    if n_layers:
+        labels = [f"{i+1}. {l['name']}" for i, l in enumerate(layers)]
+        with col2:
+            choice = st.selectbox(
+                "Edit layer", labels,
+                index=min(st.session_state.get('active_layer_enh', 0), n_layers - 1)
+            )
+        active_idx = labels.index(choice)
+        st.session_state.active_layer_enh = active_idx
     
     # Display and edit layers
-    for idx, layer in enumerate(st.session_state.soil_layers_enhanced):
+    for idx, layer in enumerate(layers):
+        if idx != active_idx:
+            continue
         with st.expander(f"**{layer['name']}** ({layer['type']}, {layer['z_top']:.1f}-{layer['z_bot']:.1f}m)", expanded=True):
             
-            # Basic layer properties
-            col1, col2, col3, col4 = st.columns(4)
+            # Edits to the properties and point grids are batched: the layer is
+            # only updated (one rerun) when the form is applied
+            with st.form(f"layer_form_{idx}"):
+                # Basic layer properties
+                col1, col2, col3, col4 = st.columns(4)
             
-            with col1:
-                layer['name'] = st.text_input("Layer name", value=layer['name'], key=f"name_enh_{idx}")
+                with col1:
+                    layer['name'] = st.text_input("Layer name", value=layer['name'], key=f"name_enh_{idx}")
             
-            with col2:
-                layer['type'] = st.selectbox("Type", ["clay", "silt", "sand"], 
-                                            index=["clay", "silt", "sand"].index(layer['type']), 
-                                            key=f"type_enh_{idx}")
+                with col2:
+                    layer['type'] = st.selectbox("Type", ENHANCED_SOIL_TYPES, 
+                                                index=_ENHANCED_TYPE_INDEX[layer['type']], 
+                                                key=f"type_enh_{idx}")
             
-            with col3:
-                layer['z_top'] = st.number_input("Top (m)", value=layer['z_top'], step=0.5, key=f"ztop_enh_{idx}")
+                with col3:
+                    layer['z_top'] = st.number_input("Top (m)", value=layer['z_top'], step=0.5, key=f"ztop_enh_{idx}")
             
-            with col4:
-                layer['z_bot'] = st.number_input("Bottom (m)", value=layer['z_bot'], step=0.5, key=f"zbot_enh_{idx}")
+                with col4:
+                    layer['z_bot'] = st.number_input("Bottom (m)", value=layer['z_bot'], step=0.5, key=f"zbot_enh_{idx}")
             
-            st.markdown("---")
+                st.markdown("---")
             
-            # Data points for each parameter
-            tabs = st.tabs(["γ' (kN/m³)", "Su (kPa)" if layer['type'] in ['clay', 'silt'] else "φ' (deg)", "Actions"])
+                # Data points for each parameter
+                tabs = st.tabs(["γ' (kN/m³)", "Su (kPa)" if layer['type'] in ['clay', 'silt'] else "φ' (deg)"])
             
-            # Gamma prime tab
-            with tabs[0]:
-                st.markdown("**Submerged unit weight data points**")
-                
-                # Add data point form
-                with st.form(f"add_gamma_{idx}"):
-                    col1, col2, col3 = st.columns([1, 1, 1])
-                    with col1:
-                        new_z = st.number_input("Depth (m)", value=layer['z_top'], 
-                                              min_value=layer['z_top'], max_value=layer['z_bot'], 
-                                              step=0.5, key=f"gamma_z_new_{idx}")
-                    with col2:
-                        new_val = st.number_input("γ' (kN/m³)", value=8.0, step=0.5, key=f"gamma_v_new_{idx}")
-                    with col3:
-                        if st.form_submit_button("Add Point", use_container_width=True):
-                            if 'gamma_points' not in layer:
-                                layer['gamma_points'] = []
-                            layer['gamma_points'].append(SoilPoint(new_z, new_val))
-                            layer['gamma_points'].sort(key=lambda p: p.z)
-                            st.rerun()
-                
-                # Display existing points
-                if layer.get('gamma_points'):
-                    df_gamma = pd.DataFrame([
-                        {'Depth (m)': p.z, 'γ\' (kN/m³)': p.v, 'Delete': f"🗑️ {i}"}
-                        for i, p in enumerate(layer['gamma_points'])
-                    ])
-                    st.dataframe(df_gamma[['Depth (m)', 'γ\' (kN/m³)']], use_container_width=True, hide_index=True)
-                    
-                    # Delete point
-                    if len(layer['gamma_points']) > 0:
-                        del_idx = st.number_input("Delete point #", min_value=1, 
-                                                 max_value=len(layer['gamma_points']), 
-                                                 value=1, step=1, key=f"del_gamma_{idx}")
-                        if st.button(f"Delete Point #{del_idx}", key=f"del_gamma_btn_{idx}"):
-                            layer['gamma_points'].pop(del_idx - 1)
-                            st.rerun()
-                else:
-                    st.info("No data points yet. Add points above.")
+                # One editable grid per parameter; rows can be added, edited or deleted in place
+                ver = st.session_state.get('pts_editor_ver', 0)
+            
+                # Gamma prime tab
+                with tabs[0]:
+                    st.markdown("**Submerged unit weight data points**")
+                    layer['gamma_points'] = _points_editor(
+                        layer.get('gamma_points') or [], f"pts_gamma_{idx}_{ver}",
+                        "γ' (kN/m³)", layer['z_top'], 8.0)
             
-            # Strength parameter tab
-            with tabs[1]:
-                if layer['type'] in ['clay', 'silt']:
-                    st.markdown("**Undrained shear strength data points**")
-                    param_name = 'su_points'
-                    param_label = 'Su (kPa)'
-                    default_val = 30.0
-                else:
-                    st.markdown("**Friction angle data points**")
-                    param_name = 'phi_points'
-                    param_label = 'φ\' (deg)'
-                    default_val = 30.0
+                # Strength parameter tab
+                with tabs[1]:
+                    if layer['type'] in ['clay', 'silt']:
+                        st.markdown("**Undrained shear strength data points**")
+                        param_name = 'su_points'
+                        param_label = 'Su (kPa)'
+                        default_val = 30.0
+                    else:
+                        st.markdown("**Friction angle data points**")
+                        param_name = 'phi_points'
+                        param_label = 'φ\' (deg)'
+                        default_val = 30.0
                 
-                # Add data point form
-                with st.form(f"add_param_{idx}"):
-                    col1, col2, col3 = st.columns([1, 1, 1])
-                    with col1:
-                        new_z = st.number_input("Depth (m)", value=layer['z_top'], 
-                                              min_value=layer['z_top'], max_value=layer['z_bot'], 
-                                              step=0.5, key=f"param_z_new_{idx}")
-                    with col2:
-                        new_val = st.number_input(param_label, value=default_val, step=5.0, key=f"param_v_new_{idx}")
-                    with col3:
-                        if st.form_submit_button("Add Point", use_container_width=True):
-                            if param_name not in layer:
-                                layer[param_name] = []
-                            layer[param_name].append(SoilPoint(new_z, new_val))
-                            layer[param_name].sort(key=lambda p: p.z)
-                            st.rerun()
+                    layer[param_name] = _points_editor(
+                        layer.get(param_name) or [], f"pts_{param_name}_{idx}_{ver}",
+                        param_label, layer['z_top'], default_val)
                 
-                # Display existing points
-                if layer.get(param_name):
-                    df_param = pd.DataFrame([
-                        {'Depth (m)': p.z, param_label: p.v}
-                        for i, p in enumerate(layer[param_name])
-                    ])
-                    st.dataframe(df_param, use_container_width=True, hide_index=True)
-                    
-                    # Delete point
-                    if len(layer[param_name]) > 0:
-                        del_idx = st.number_input("Delete point #", min_value=1, 
-                                                 max_value=len(layer[param_name]), 
-                                                 value=1, step=1, key=f"del_param_{idx}")
-                        if st.button(f"Delete Point #{del_idx}", key=f"del_param_btn_{idx}"):
-                            layer[param_name].pop(del_idx - 1)
-                            st.rerun()
-                else:
-                    st.info("No data points yet. Add points above.")
+                st.form_submit_button("Apply layer changes", type="primary")
             
-            # Actions tab
-            with tabs[2]:
-                col1, col2 = st.columns(2)
-                with col1:
-                    if st.button(f"🗑️ Delete Layer", key=f"del_layer_{idx}", use_container_width=True):
-                        st.session_state.soil_layers_enhanced.pop(idx)
-                        st.rerun()
-                
-                with col2:
-                    # Add quick fill option
-                    if st.button(f"🎯 Auto-fill with linear profile", key=f"autofill_{idx}", use_container_width=True):
-                        # Auto-fill with top and bottom values
-                        if not layer.get('gamma_points'):
-                            layer['gamma_points'] = [
-                                SoilPoint(layer['z_top'], 7.0),
-                                SoilPoint(layer['z_bot'], 8.0)
-                            ]
-                        
-                        if layer['type'] in ['clay', 'silt'] and not layer.get('su_points'):
-                            layer['su_points'] = [
-                                SoilPoint(layer['z_top'], 20.0),
-                                SoilPoint(layer['z_bot'], 50.0)
-                            ]
-                        elif layer['type'] == 'sand' and not layer.get('phi_points'):
-                            layer['phi_points'] = [
-                                SoilPoint(layer['z_top'], 30.0),
-                                SoilPoint(layer['z_bot'], 35.0)
-                            ]
-                        st.rerun()
+            # Actions (buttons can't live inside a form)
+            col1, col2 = st.columns(2)
+            with col1:
+                st.button(f"🗑️ Delete Layer", key=f"del_layer_{idx}", use_container_width=True,
+                          on_click=_delete_enhanced_layer, args=(idx,))
+            
+            with col2:
+                # Add quick fill option
+                st.button(f"🎯 Auto-fill with linear profile", key=f"autofill_{idx}", use_container_width=True,
+                          on_click=_autofill_enhanced_layer, args=(idx,))
     
     # Summary of all layers
-    if st.session_state.soil_layers_enhanced:
+    if layers:
         st.markdown("---")
         st.markdown("### Profile Summary")
         
-        summary_data = []
-        for i, layer in enumerate(st.session_state.soil_layers_enhanced):
-            summary_data.append({
-                '#': i+1,
-                'Name': layer['name'],
-                'Type': layer['type'],
-                'Depths': f"{layer['z_top']:.1f}-{layer['z_bot']:.1f}m",
-                'γ\' points': len(layer.get('gamma_points', [])),
-                'Su points': len(layer.get('su_points', [])) if layer['type'] in ['clay', 'silt'] else '—',
-                'φ\' points': len(layer.get('phi_points', [])) if layer['type'] == 'sand' else '—'
-            })
-        
-        st.dataframe(pd.DataFrame(summary_data), use_container_width=True, hide_index=True)
+        st.dataframe(_layer_summary_frame(layers),
+                     hide_index=True, **_TABLE_FULL_WIDTH)
         
         # Clear all button
-        if st.button("🗑️ Clear All Layers", use_container_width=True):
-            st.session_state.soil_layers_enhanced = []
-            st.rerun()
-        
-        return _convert_to_layers(st.session_state.soil_layers_enhanced)
+        st.button("🗑️ Clear All Layers", use_container_width=True, on_click=_clear_enhanced_layers)
     else:
         st.info("👆 Click 'Add New Layer' to start building your soil profile")
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _parse_pasted_layers(text: str) -> list:
+    """
+    Parse pasted multi-point CSV text into layer dicts (points sorted by depth).
+    Cached on the raw text, so reruns with an unchanged paste skip the parse.
+    """
+    text = text.strip()
+    if not text:
+        return []
+    # Rows are ragged (any number of depth-value pairs), so size the frame to the widest
+    n_cols = max(line.count(',') for line in text.splitlines()) + 1
+    raw = pd.read_csv(io.StringIO(text), header=None, names=range(n_cols), dtype=str,
+                      skipinitialspace=True, skip_blank_lines=True)
+    raw = raw.apply(lambda col: col.str.strip())
+    
+    # Minimum: name, type, z_top, z_bot, param, one depth-value pair
+    n_fields = raw.notna().sum(axis=1).to_numpy()
+    keep = n_fields >= 7
+    if not keep.any():
+        # Nothing long enough to be a layer line (also covers frames too narrow
+        # to have the integer column labels used below)
         return []
+    raw, n_fields = raw[keep], n_fields[keep]
+    
+    # Column-wise conversion; a non-numeric depth, value or bound raises here
+    z_tops = raw[2].astype(float).tolist()
+    z_bots = raw[3].astype(float).tolist()
+    values = raw.iloc[:, 5:].apply(pd.to_numeric).to_numpy(dtype=float)
+    
+    # Parse into layer structure
+    layers_dict = {}
+    
+    for row, nf, name, soil_type, z_top, z_bot, param_type in zip(
+            values, n_fields, raw[0], raw[1].str.lower(), z_tops, z_bots, raw[4].str.lower()):
+        
+        # Create unique key for layer
+        layer_key = f"{name}_{z_top}_{z_bot}"
+        
+        # Initialize layer if not exists
+        if layer_key not in layers_dict:
+            layers_dict[layer_key] = {
+                'name': name,
+                'type': soil_type,
+                'z_top': z_top,
+                'z_bot': z_bot,
+                'gamma_points': [],
+                'su_points': [],
+                'phi_points': []
+            }
+        
+        # Depth-value pairs (a trailing unpaired token is ignored)
+        pairs = row[:2 * ((nf - 5) // 2)].reshape(-1, 2)
+        if np.isnan(pairs).any():
+            raise ValueError(f"Missing depth/value in '{name}' {param_type} row")
+        
+        # Collect pair arrays per parameter; points are built once after sorting
+        if param_type in ['gamma', 'γ', "γ'"]:
+            layers_dict[layer_key]['gamma_points'].append(pairs)
+        elif param_type in ['su', 'cu']:
+            layers_dict[layer_key]['su_points'].append(pairs)
+        elif param_type in ['phi', 'φ', "φ'"]:
+            layers_dict[layer_key]['phi_points'].append(pairs)
+    
+    # Convert to list
+    layers_data = list(layers_dict.values())
+    
+    # Sort points within each layer (stable, so equal depths keep their pasted order)
+    for layer in layers_data:
+        for param in ('gamma_points', 'su_points', 'phi_points'):
+            if not layer[param]:
+                continue
+            pairs = np.concatenate(layer[param])
+            pairs = pairs[np.argsort(pairs[:, 0], kind='stable')]
+            layer[param] = list(map(SoilPoint, pairs[:, 0].tolist(), pairs[:, 1].tolist()))
+    
+    return layers_data
 
 def _paste_input_enhanced():
     """Enhanced paste data from Excel/CSV with multiple points per layer."""
@@ -393,93 +710,22 @@ Sand, sand, 10, 20, phi, 10, 32, 15, 33, 20, 35""", language="csv")
     
     if pasted:
         try:
-            from io import StringIO
-            lines = pasted.strip().split('\n')
-            
-            # Parse into layer structure
-            layers_dict = {}
-            
-            for line in lines:
-                parts = [p.strip() for p in line.split(',')]
-                if len(parts) < 7:  # Minimum: name, type, z_top, z_bot, param, one depth-value pair
-                    continue
-                
-                name = parts[0]
-                soil_type = parts[1].lower()
-                z_top = float(parts[2])
-                z_bot = float(parts[3])
-                param_type = parts[4].lower()
-                
-                # Create unique key for layer
-                layer_key = f"{name}_{z_top}_{z_bot}"
-                
-                # Initialize layer if not exists
-                if layer_key not in layers_dict:
-                    layers_dict[layer_key] = {
-                        'name': name,
-                        'type': soil_type,
-                        'z_top': z_top,
-                        'z_bot': z_bot,
-                        'gamma_points': [],
-                        'su_points': [],
-                        'phi_points': []
-                    }
-                
-                # Parse depth-value pairs
-                points = []
-                for i in range(5, len(parts), 2):
-                    if i+1 < len(parts):
-                        depth = float(parts[i])
-                        value = float(parts[i+1])
-                        points.append(SoilPoint(depth, value))
-                
-                # Add points to appropriate parameter
-                if param_type in ['gamma', 'γ', "γ'"]:
-                    layers_dict[layer_key]['gamma_points'].extend(points)
-                elif param_type in ['su', 'cu']:
-                    layers_dict[layer_key]['su_points'].extend(points)
-                elif param_type in ['phi', 'φ', "φ'"]:
-                    layers_dict[layer_key]['phi_points'].extend(points)
-            
-            # Convert to list
-            layers_data = list(layers_dict.values())
-            
-            # Sort points within each layer
-            for layer in layers_data:
-                layer['gamma_points'].sort(key=lambda p: p.z)
-                layer['su_points'].sort(key=lambda p: p.z)
-                layer['phi_points'].sort(key=lambda p: p.z)
+            layers_data = _parse_pasted_layers(pasted)
             
             st.success(f"✅ Parsed {len(layers_data)} layers")
             
             # Show preview
-            preview_data = []
-            for i, layer in enumerate(layers_data):
-                preview_data.append({
-                    '#': i+1,
-                    'Name': layer['name'],
-                    'Type': layer['type'],
-                    'Depths': f"{layer['z_top']:.1f}-{layer['z_bot']:.1f}m",
-                    'γ\' points': len(layer['gamma_points']),
-                    'Su points': len(layer['su_points']) if layer['type'] in ['clay', 'silt'] else '—',
-                    'φ\' points': len(layer['phi_points']) if layer['type'] == 'sand' else '—'
-                })
-            
-            st.dataframe(pd.DataFrame(preview_data), use_container_width=True, hide_index=True)
-            
-            return _convert_to_layers(layers_data)
+            st.dataframe(_layer_summary_frame(layers_data), hide_index=True, **_TABLE_FULL_WIDTH)
             
         except Exception as e:
             st.error(f"Error parsing data: {str(e)}")
             st.write("Please check format and try again.")
-            return []
-    
-    return []
 
 def soil_input_widget_enhanced():
     """
     Enhanced interactive soil input widget with multiple data points per parameter.
-    Returns list of SoilLayer objects compatible with existing code.
+    Edits st.session_state.soil_layers_enhanced in place; SoilLayer objects are
+    only built when Run analysis is pressed.
     """
     
     st.markdown("#### Soil profile")
@@ -489,12 +735,10 @@ def soil_input_widget_enhanced():
     tab1, tab2 = st.tabs(["📊 Interactive Table", "📋 Paste from Excel"])
     
     with tab1:
-        layers = _enhanced_interactive_input()
+        _enhanced_interactive_input()
     
     with tab2:
-        layers = _paste_input_enhanced()
-    
-    return layers
+        _paste_input_enhanced()
 
 # ============= Choose Input Method =============
 st.markdown("#### Soil Profile Input Method")
@@ -510,36 +754,65 @@ if input_method == "Simple Layer Builder":
     st.markdown("##### Soil profile")
     st.caption("Add layers from seabed downward. Use semicolon-separated pairs for data points.")
     
-    # Layer builder
+    # Layer builder: one editable grid instead of seven widgets per layer.
+    # `layers_base` is what the grid was opened with; the grid's own edit state
+    # sits on top of it, and `layers` always holds the current (edited) rows.
+    # Streamlit drops that edit state whenever the grid is not rendered (e.g.
+    # while the other input method is selected), so the snapshot is retaken
+    # from `layers` then.
     if "layers" not in st.session_state:
         st.session_state.layers = []
+    if "layers_base" not in st.session_state:
+        st.session_state.layers_base = list(st.session_state.layers)
+        st.session_state.layers_editor_ver = 0
     
     def _add_layer():
-        st.session_state.layers.append({
-            "name": f"Layer {len(st.session_state.layers)+1}",
-            "z_top": 0.0 if not st.session_state.layers else st.session_state.layers[-1]["z_bot"],
-            "z_bot": (0.0 if not st.session_state.layers else st.session_state.layers[-1]["z_bot"]) + 2.0,
+        layers = list(st.session_state.layers)
+        prev_bot = layers[-1]["z_bot"] if layers else 0.0
+        layers.append({
+            "name": f"Layer {len(layers)+1}",
+            "z_top": prev_bot,
+            "z_bot": prev_bot + 2.0,
             "type": "clay",
             "gamma_pairs": "0,10.0; 2,10.0",
             "su_pairs":    "0,30;   2,35",
             "phi_pairs":   "",
         })
+        # Re-open the grid on the new rows (fresh editor key drops stale edits)
+        st.session_state.layers = layers
+        st.session_state.layers_base = layers
+        st.session_state.layers_editor_ver += 1
     
     st.button("➕ Add layer", on_click=_add_layer)
-    for i, L in enumerate(st.session_state.layers):
-        with st.expander(f"Layer {i+1}", expanded=True):
-            c1, c2, c3, c4 = st.columns([1.2,1.2,1.2,1.2])
-            L["name"]  = c1.text_input("Name", L["name"], key=f"name{i}")
-            L["z_top"] = c2.number_input("z_top (m)", value=float(L["z_top"]), key=f"z1{i}", step=0.1)
-            L["z_bot"] = c3.number_input("z_bot (m)", value=float(L["z_bot"]), key=f"z2{i}", step=0.1)
-            L["type"]  = c4.selectbox("Type", ["clay","sand","silt","unknown"], 
-                                      index=["clay","sand","silt","unknown"].index(L["type"]), key=f"type{i}")
-            L["gamma_pairs"] = st.text_input("γ′ pairs 'z,val; z,val; ...'  (kN/m³)", L["gamma_pairs"], key=f"g{i}",
-                                            help="Example: 0,7.0; 5,7.5; 10,8.0")
-            L["su_pairs"]    = st.text_input("Su pairs 'z,val; z,val; ...'  (kPa)", L["su_pairs"],    key=f"su{i}",
-                                            help="Example: 0,20; 3,25; 6,30; 10,40")
-            L["phi_pairs"]   = st.text_input("ϕ′ pairs 'z,val; z,val; ...' (deg)", L["phi_pairs"],   key=f"phi{i}",
-                                            help="Example: 10,32; 15,33; 20,35")
+    editor_key = f"simple_layers_{st.session_state.layers_editor_ver}"
+    if editor_key not in st.session_state:
+        st.session_state.layers_base = list(st.session_state.layers)
+    edited = st.data_editor(
+        pd.DataFrame(st.session_state.layers_base, columns=SIMPLE_LAYER_COLUMNS),
+        key=editor_key,
+        num_rows="dynamic",
+        hide_index=True,
+        **_EDITOR_FULL_WIDTH,
+        column_config={
+            "name": st.column_config.TextColumn("Name", default="New layer"),
+            "z_top": st.column_config.NumberColumn("z_top (m)", step=0.1, default=0.0, required=True),
+            "z_bot": st.column_config.NumberColumn("z_bot (m)", step=0.1, default=2.0, required=True),
+            "type": st.column_config.SelectboxColumn("Type", options=["clay", "sand", "silt", "unknown"],
+                                                     default="clay", required=True),
+            "gamma_pairs": st.column_config.TextColumn("γ′ pairs (kN/m³)", default="",
+                                                       help="'z,val; z,val; ...'  Example: 0,7.0; 5,7.5; 10,8.0"),
+            "su_pairs": st.column_config.TextColumn("Su pairs (kPa)", default="",
+                                                    help="'z,val; z,val; ...'  Example: 0,20; 3,25; 6,30; 10,40"),
+            "phi_pairs": st.column_config.TextColumn("ϕ′ pairs (deg)", default="",
+                                                     help="'z,val; z,val; ...'  Example: 10,32; 15,33; 20,35"),
+        },
+    )
+    st.session_state.layers = [
+        {**row,
+         "name": row["name"] if isinstance(row["name"], str) and row["name"] else f"Layer {i+1}",
+         **{k: row[k] if isinstance(row[k], str) else "" for k in ("gamma_pairs", "su_pairs", "phi_pairs")}}
+        for i, row in enumerate(edited.to_dict("records"))
+    ]
     
     # Store method for run analysis
     st.session_state.current_input_method = "simple"
@@ -552,29 +825,37 @@ else:
 st.divider()
 
 # ============= Run Analysis Button =============
+def _soil_signature() -> tuple:
+    """(method, repr of the active layer source) - cheap change detector for the soil inputs."""
+    method = st.session_state.get('current_input_method')
+    source = st.session_state.get('layers' if method == 'simple' else 'soil_layers_enhanced', [])
+    return (method, repr(source))
+
+def _inputs_key() -> int:
+    """Fingerprint of every input the analysis depends on (spudcan, switches, soil)."""
+    return hash((_spud_key(spud), dmax, dz, use_min_cu, phi_reduce, windward80, squeeze_trig,
+                 *_soil_signature()))
+
+def _clear_results():
+    st.session_state.analysis_run = False
+    st.session_state.analysis_results = None
+
 do_run = st.button("Run analysis", type="primary")
 if do_run:
     # Debug: Show current input method
     current_method = st.session_state.get('current_input_method', 'unknown')
     
-    # Build SoilLayer list based on input method
+    # The flattened layers key is built once per soil change and kept in session
+    # state, so re-running with the same soil skips layer parsing and flattening.
+    soil_sig = _soil_signature()
     layers = []
-    
-    if current_method == 'simple':
+    layers_key = None
+    if st.session_state.get('_layers_key_sig') == soil_sig:
+        layers_key = st.session_state.layers_key
+    elif current_method == 'simple':
         # Simple method - from st.session_state.layers
         if 'layers' in st.session_state and st.session_state.layers:
-            for L in st.session_state.layers:
-                layers.append(
-                    SoilLayer(
-                        name=L["name"],
-                        z_top=float(L["z_top"]),
-                        z_bot=float(L["z_bot"]),
-                        soil_type=L["type"],
-                        gamma=_parse_pairs(L["gamma_pairs"]),
-                        su=_parse_pairs(L["su_pairs"]),
-                        phi=_parse_pairs(L["phi_pairs"]),
-                    )
-                )
+            layers = [_layer_from_row(L) for L in st.session_state.layers]
     elif current_method == 'enhanced':
         # Enhanced method - convert directly from session state
         if 'soil_layers_enhanced' in st.session_state and st.session_state.soil_layers_enhanced:
@@ -584,7 +865,12 @@ if do_run:
                 st.error(f"Error converting layers: {str(e)}")
                 layers = []
     
-    if not layers:
+    if layers:
+        layers_key = _layers_key(layers)
+        st.session_state.layers_key = layers_key
+        st.session_state._layers_key_sig = soil_sig
+
+    if not layers_key:
         # Provide more helpful error message
         if current_method == 'enhanced':
             if 'soil_layers_enhanced' not in st.session_state:
@@ -606,20 +892,17 @@ if do_run:
 
     # Compute
     with st.spinner("Computing penetration analysis..."):
-        df = compute_envelopes(
-            spud=spud,
-            layers=layers,
-            max_depth=dmax,
+        # Envelopes and penetration results from one engine call
+        df, pen = _analysis_cached(
+            _spud_key(spud),
+            layers_key,
+            dmax=dmax,
             dz=dz,
             use_min_cu=use_min_cu,
             phi_reduction=phi_reduce,
             windward_factor=windward80,
             squeeze_trigger=squeeze_trig,
-            meyerhof_table=None,
         )
-
-        # Penetration results
-        pen = penetration_results(spud, df)
         
         # STORE RESULTS IN SESSION STATE TO PERSIST ACROSS RERUNS
         st.session_state.analysis_results = {
@@ -628,16 +911,22 @@ if do_run:
             'spud': spud,
             'use_advanced_nc': use_advanced_nc,
             'beta_deg': beta_deg,
-            'alpha': alpha
+            'alpha': alpha,
+            'run_key': _inputs_key(),
+            'df_hash': _frame_fingerprint(df)
         }
         st.session_state.analysis_run = True
 
+# Fingerprint of the live inputs, taken before the stored results are unpacked
+current_key = _inputs_key()
+
 # Display results if analysis has been run
 if st.session_state.get('analysis_run', False):
     # Retrieve stored results
     df = st.session_state.analysis_results['df']
     pen = st.session_state.analysis_results['pen']
-    spud = st.session_state.analysis_results['spud']
+    df_hash = st.session_state.analysis_results['df_hash']
+    res_spud = st.session_state.analysis_results['spud']
     use_advanced_nc = st.session_state.analysis_results['use_advanced_nc']
     beta_deg = st.session_state.analysis_results.get('beta_deg')
     alpha = st.session_state.analysis_results.get('alpha')
@@ -645,17 +934,17 @@ if st.session_state.get('analysis_run', False):
     # --- Results summary ---
     with st.container():
         st.subheader("Results")
+        if st.session_state.analysis_results.get('run_key') != current_key:
+            st.warning("⚠️ Inputs have changed since these results were computed. "
+                       "Press **Run analysis** to update them.")
         
         # Add clear button to reset analysis
         col_head1, col_head2 = st.columns([5, 1])
         with col_head2:
-            if st.button("🔄 Clear", help="Clear results and start new analysis"):
-                st.session_state.analysis_run = False
-                st.session_state.analysis_results = None
-                st.rerun()
+            st.button("🔄 Clear", help="Clear results and start new analysis", on_click=_clear_results)
         
         cols = st.columns(3)
-        cols[0].metric("Preload per leg", f"{spud.preload_MN:.2f} MN")
+        cols[0].metric("Preload per leg", f"{res_spud.preload_MN:.2f} MN")
         
         if pen["tip_range_min"] is not None and pen["tip_range_max"] is not None and pen["tip_range_min"] != pen["tip_range_max"]:
             cols[1].metric("Tip penetration range", f"{pen['tip_range_min']:.2f} – {pen['tip_range_max']:.2f} m")
@@ -681,52 +970,115 @@ if st.session_state.get('analysis_run', False):
     # --- Enhanced Plotting with Controls ---
     if ENHANCED_PLOTTING_AVAILABLE:
         # Use the enhanced plotting with interactive controls
-        create_streamlit_plot_with_controls(df, spud, pen)
+        _matplotlib()  # import + rcParams before the plotting module draws
+        create_streamlit_plot_with_controls(df, res_spud, pen)
         
         # Optional: Add a checkbox to show failure modes
         if 'squeezing_active' in df.columns:
             show_failures = st.checkbox("Show failure mode zones on plot", value=False)
             if show_failures:
                 st.subheader("📊 Penetration Curve with Failure Modes")
-                fig, ax = plot_penetration_curve_v4(
-                    df=df,
-                    preload_MN=spud.preload_MN,
-                    tip_offset_m=spud.tip_elev,
-                    rig_name=spud.rig_name
-                )
-                add_failure_mode_annotations(ax, df)
-                st.pyplot(fig)
-                plt.close(fig)
+
+                def _build_failure_fig():
+                    fig, ax = plot_penetration_curve_v4(
+                        df=df,
+                        preload_MN=res_spud.preload_MN,
+                        tip_offset_m=res_spud.tip_elev,
+                        rig_name=res_spud.rig_name
+                    )
+                    add_failure_mode_annotations(ax, df)
+                    return fig
+
+                _show_figure("failure_modes",
+                             _plot_key(df_hash, res_spud.preload_MN, res_spud.tip_elev, res_spud.rig_name),
+                             _build_failure_fig,
+                             file_name=f"{res_spud.rig_name}_failure_modes.png")
     else:
         # Fallback to basic plotting if enhanced module not available
         st.subheader("📊 Penetration Curve")
-        fig, ax = plt.subplots(figsize=(4.2, 6.2), dpi=200)
-        ax.plot(df["idle_clay_MN"], df["depth"], lw=0.8, ls="-", color="0.6", label="Idle Clay")
-        ax.plot(df["idle_sand_MN"], df["depth"], lw=0.8, ls="--", color="0.6", label="Idle Sand")
-        ax.plot(df["real_MN"], df["depth"], lw=1.8, color="#0033cc", label="REAL (governing)")
-
-        # preload line
-        ax.axvline(spud.preload_MN, ymin=0, ymax=1, color="red", lw=1.2, ls="--", label="Preload")
-
-        # Add horizontal line at tip_elev to show where capacity starts
-        if spud.tip_elev > 0:
-            ax.axhline(spud.tip_elev, xmin=0, xmax=1, color="orange", lw=1.0, ls=":", 
-                      label=f"Tip offset ({spud.tip_elev:.2f}m)")
-
-        ax.set_xlabel("Leg load (MN)")
-        ax.set_ylabel("Penetration of widest section (m)")
-        ax.invert_yaxis()
-        ax.grid(True, ls=":", lw=0.6, color="0.7")
-        ax.set_xlim(left=0)
-        ax.legend(loc="upper right", fontsize=7, frameon=True)
-        st.pyplot(fig, clear_figure=True)
+
+        def _build_basic_fig():
+            _matplotlib()
+            from matplotlib.collections import LineCollection
+            from matplotlib.figure import Figure
+            from matplotlib.lines import Line2D
+
+            fig = Figure(figsize=(4.2, 6.2))  # output dpi is set by _show_figure
+            ax = fig.subplots()
+
+            # All three capacity curves go into a single LineCollection (one draw call);
+            # proxy artists stand in for them in the legend.
+            curve_styles = [  # (column, label, linewidth, linestyle, color)
+                ("idle_clay_MN", "Idle Clay", 0.8, "-", "0.6"),
+                ("idle_sand_MN", "Idle Sand", 0.8, "--", "0.6"),
+                ("real_MN", "REAL (governing)", 1.8, "-", "#0033cc"),
+            ]
+            # The idle curves are context only, so long frames are stride-subsampled to
+            # ~1500 points; REAL keeps full resolution for the preload intersection.
+            # Pull each column out of the frame once as a float32 array (plenty for
+            # plotting, half the bytes handed to Agg)
+            arrs = {col: df[col].to_numpy(dtype=np.float32) for col in ["depth"] + [c for c, *_ in curve_styles]}
+            depth_arr = arrs["depth"]
+            step = max(1, len(df) // 1500)
+            ax.add_collection(LineCollection(
+                [np.column_stack([arrs[col], depth_arr]) if col == "real_MN"
+                 else np.column_stack([arrs[col][::step], depth_arr[::step]])
+                 for col, *_ in curve_styles],
+                linewidths=[lw for _, _, lw, _, _ in curve_styles],
+                linestyles=[ls for _, _, _, ls, _ in curve_styles],
+                colors=[c for *_, c in curve_styles],
+            ))
+            ax.autoscale_view()
+            curve_handles = [Line2D([], [], lw=lw, ls=ls, color=c, label=label)
+                             for _, label, lw, ls, c in curve_styles]
+
+            # preload line
+            ax.axvline(res_spud.preload_MN, ymin=0, ymax=1, color="red", lw=1.2, ls="--", label="Preload")
+
+            # Add horizontal line at tip_elev to show where capacity starts
+            if res_spud.tip_elev > 0:
+                ax.axhline(res_spud.tip_elev, xmin=0, xmax=1, color="orange", lw=1.0, ls=":", 
+                          label=f"Tip offset ({res_spud.tip_elev:.2f}m)")
+
+            ax.set_xlabel("Leg load (MN)")
+            ax.set_ylabel("Penetration of widest section (m)")
+            ax.invert_yaxis()
+            ax.grid(True, ls=":", lw=0.6, color="0.7")
+            ax.set_xlim(left=0)
+            line_handles, _ = ax.get_legend_handles_labels()
+            ax.legend(handles=curve_handles + line_handles, loc="upper right", fontsize=7, frameon=True)
+            return fig
+
+        _show_figure("basic",
+                     _plot_key(df_hash, res_spud.preload_MN, res_spud.tip_elev),
+                     _build_basic_fig,
+                     file_name=f"{res_spud.rig_name}_penetration_curve.png")
 
     # --- Table & downloads ---
     st.subheader("Detailed table")
-    st.dataframe(df, use_container_width=True, height=320)
+    # Only the headline columns are serialised to the browser by default; the
+    # CSV always carries every column and row.
+    table_cols = list(df.columns) if st.checkbox("Show all columns", value=False) else \
+        [c for c in TABLE_COLUMNS if c in df.columns]
+    # Long runs ship a decimated preview to the browser
+    # The frame is converted to Arrow once per run; later reruns only slice the
+    # table instead of redoing the pandas -> Arrow conversion. Floats go to the
+    # browser as float32 (half the payload); the CSV keeps full precision.
+    results = st.session_state.analysis_results
+    if results.get('arrow') is None:
+        arrow = pa.Table.from_pandas(df, preserve_index=False)
+        results['arrow'] = arrow.cast(pa.schema(
+            [f.with_type(pa.float32()) if pa.types.is_float64(f.type) else f for f in arrow.schema]))
+    table = results['arrow'].select(table_cols)
+    if len(df) > 500 and not st.checkbox(f"Show full table ({len(df)} rows)", value=False):
+        step = max(1, len(df) // 500)
+        st.caption(f"Showing 1 in {step} depth steps. Tick the box above or download the CSV for the full table.")
+        st.dataframe(table.take(np.arange(0, len(df), step)), height=320, **_TABLE_FULL_WIDTH)
+    else:
+        st.dataframe(table, height=320, **_TABLE_FULL_WIDTH)
 
-    csv = df.to_csv(index=False).encode("utf-8")
-    st.download_button("Download CSV", data=csv, file_name=f"{spud.rig_name}_v2_results.csv", mime="text/csv")
+    csv = _df_to_csv_bytes(df_hash, df)
+    st.download_button("Download CSV", data=csv, file_name=f"{res_spud.rig_name}_v2_results.csv", mime="text/csv")
 
     # Summary note
     st.caption(
@@ -64,31 +64,44 @@ def analyze_penetration_enhanced(
     warnings = []
     punch_through_zones = []
     
+    # Pull the columns out once; compute_envelopes() returns depth ascending,
+    # so every depth window below is a searchsorted slice (see _window).
+    depth = df['depth'].to_numpy(dtype=float)
+    if not np.all(depth[1:] >= depth[:-1]):
+        raise ValueError("envelope depths must be ascending")
+    cap = df['real_MN'].to_numpy(dtype=float)
+    sq_active = df['squeezing_active'].to_numpy() == 'YES'
+    punch_active = ((df['punch_clay_clay_active'].to_numpy() == 'YES') |
+                    (df['punch_sand_clay_active'].to_numpy() == 'YES'))
+    
     # Step 1: Find all intersections with preload line
-    intersections = _find_all_intersections(df, preload_MN)
+    intersections = _find_all_intersections(depth, cap, preload_MN)
     
     if not intersections:
         # No intersection found - preload too high
-        max_capacity = df['real_MN'].max()
+        max_capacity = np.nanmax(cap)
+        max_depth = depth.max()
         warnings.append(f"⚠️ Preload ({preload_MN:.1f} MN) exceeds maximum capacity ({max_capacity:.1f} MN)")
         warnings.append("Spudcan will penetrate to maximum analyzed depth")
         
         return PenetrationPrediction(
-            static_depth=df['depth'].max(),
-            dynamic_lower=df['depth'].max(),
-            dynamic_upper=df['depth'].max(),
-            final_range=f"> {df['depth'].max():.1f}m (exceeds analysis depth)",
+            static_depth=max_depth,
+            dynamic_lower=max_depth,
+            dynamic_upper=max_depth,
+            final_range=f"> {max_depth:.1f}m (exceeds analysis depth)",
             warnings=warnings,
             punch_through_zones=[],
             re_entry_possible=False,
-            recommended_design_depth=df['depth'].max()
+            recommended_design_depth=max_depth
         )
     
     # First intersection (static equilibrium prediction)
     first_depth = intersections[0]
     
     # Step 2: Check for punch-through zones near first intersection
-    punch_zones = _find_punch_through_zones_after(df, first_depth, distance_ahead=10.0)
+    punch_zones = _find_punch_through_zones_after(
+        depth, punch_active, first_depth, distance_ahead=10.0
+    )
     
     if punch_zones:
         for pz_start, pz_end in punch_zones:
@@ -118,11 +131,10 @@ def analyze_penetration_enhanced(
     estimated_overshoot = min(first_depth * overshoot_factor, max_overshoot_m)
     
     # Check soil strength just below first intersection
-    below_zone = df[(df['depth'] > first_depth) & 
-                    (df['depth'] <= first_depth + estimated_overshoot)]
+    lo, hi = _window(depth, first_depth, first_depth + estimated_overshoot, inclusive='right')
     
-    if not below_zone.empty:
-        avg_capacity_below = below_zone['real_MN'].mean()
+    if hi > lo:
+        avg_capacity_below = _nanmean(cap[lo:hi])
         strength_ratio = avg_capacity_below / preload_MN
         
         if strength_ratio > 1.5:  # Strong soil below
@@ -144,11 +156,10 @@ def analyze_penetration_enhanced(
         second_depth = intersections[1]
         
         # Analyze soil between first and second intersections
-        between_zone = df[(df['depth'] > first_depth) & 
-                         (df['depth'] < second_depth)]
+        lo, hi = _window(depth, first_depth, second_depth, inclusive='neither')
         
-        if not between_zone.empty:
-            avg_capacity_between = between_zone['real_MN'].mean()
+        if hi > lo:
+            avg_capacity_between = _nanmean(cap[lo:hi])
             strength_ratio_between = avg_capacity_between / preload_MN
             
             if strength_ratio_between > reentry_strength_threshold:
@@ -174,13 +185,11 @@ def analyze_penetration_enhanced(
         re_entry_possible = False
     
     # Step 5: Check for squeezing zones
-    squeezing_depths = df[df['squeezing_active'] == 'YES']['depth'].values
-    if len(squeezing_depths) > 0:
-        sq_in_range = squeezing_depths[(squeezing_depths >= dynamic_lower) & 
-                                       (squeezing_depths <= dynamic_upper)]
-        if len(sq_in_range) > 0:
-            warnings.append(f"⚠️ Squeezing detected in predicted range ({sq_in_range.min():.1f}-{sq_in_range.max():.1f}m)")
-            warnings.append("   → Monitor penetration rate during installation")
+    lo, hi = _window(depth, dynamic_lower, dynamic_upper, inclusive='both')
+    sq_in_range = depth[lo:hi][sq_active[lo:hi]]
+    if len(sq_in_range) > 0:
+        warnings.append(f"⚠️ Squeezing detected in predicted range ({sq_in_range.min():.1f}-{sq_in_range.max():.1f}m)")
+        warnings.append("   → Monitor penetration rate during installation")
     
     # Step 6: Final recommendations
     final_range = f"{dynamic_lower:.1f} to {dynamic_upper:.1f}m"
@@ -206,11 +215,16 @@ def analyze_penetration_enhanced(
     )
 
 
-def _find_all_intersections(df: pd.DataFrame, preload_MN: float) -> List[float]:
-    """Find all depths where capacity crosses preload line."""
-    
-    depths = df['depth'].values
-    capacity = df['real_MN'].values
+def _find_all_intersections(
+    depths: np.ndarray,
+    capacity: np.ndarray,
+    preload_MN: float
+) -> List[float]:
+    """
+    Find all depths where capacity crosses preload line.
+
+    ``depths`` and ``capacity`` are the aligned depth and real_MN columns.
+    """
     
     # Remove NaN values
     mask = ~np.isnan(capacity)
@@ -220,77 +234,66 @@ def _find_all_intersections(df: pd.DataFrame, preload_MN: float) -> List[float]:
     if len(capacity) < 2:
         return []
     
-    intersections = []
-    
     # Find crossings from below to above
-    for i in range(len(capacity) - 1):
-        if capacity[i] < preload_MN <= capacity[i+1]:
-            # Linear interpolation to find exact crossing
-            if capacity[i+1] != capacity[i]:
-                frac = (preload_MN - capacity[i]) / (capacity[i+1] - capacity[i])
-                crossing_depth = depths[i] + frac * (depths[i+1] - depths[i])
-                intersections.append(crossing_depth)
-    
-    return intersections
+    diff = capacity - preload_MN
+    cross = np.flatnonzero((diff[:-1] < 0) & (diff[1:] >= 0))
+    d0, d1 = diff[cross], diff[cross + 1]
+    
+    # Linear interpolation to find exact crossing (d0 < 0 <= d1, so d1 != d0)
+    frac = -d0 / (d1 - d0)
+    intersections = depths[cross] + frac * (depths[cross + 1] - depths[cross])
+    
+    return intersections.tolist()
 
 
 def _find_punch_through_zones_after(
-    df: pd.DataFrame, 
+    depth: np.ndarray,
+    punch_active: np.ndarray,
     start_depth: float, 
     distance_ahead: float = 10.0
 ) -> List[Tuple[float, float]]:
     """
     Find punch-through zones within distance_ahead of start_depth.
     
+    ``depth`` must be ascending; ``punch_active`` is the boolean "clay/clay
+    or sand/clay punch-through" flag aligned with it, so overlapping zones
+    of the two kinds come out as one.
+    
     Returns list of (start_depth, end_depth) tuples for each zone.
     """
     
     # Get data within range
-    search_zone = df[(df['depth'] >= start_depth) & 
-                     (df['depth'] <= start_depth + distance_ahead)]
-    
-    zones = []
-    
-    # Check for clay/clay punch-through
-    cc_active = search_zone[search_zone['punch_clay_clay_active'] == 'YES']
-    if not cc_active.empty:
-        zones.append((cc_active['depth'].min(), cc_active['depth'].max()))
+    lo, hi = _window(depth, start_depth, start_depth + distance_ahead, inclusive='both')
+    window = depth[lo:hi]
     
-    # Check for sand/clay punch-through
-    sc_active = search_zone[search_zone['punch_sand_clay_active'] == 'YES']
-    if not sc_active.empty:
-        zones.append((sc_active['depth'].min(), sc_active['depth'].max()))
-    
-    # Merge overlapping zones
-    if zones:
-        zones = _merge_overlapping_zones(zones)
-    
-    return zones
+    # Each contiguous run of active rows is its own zone
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], punch_active[lo:hi], [0])).astype(np.int8)))
+    return list(zip(window[edges[0::2]].tolist(), window[edges[1::2] - 1].tolist()))
 
 
-def _merge_overlapping_zones(zones: List[Tuple[float, float]]) -> List[Tuple[float, float]]:
-    """Merge overlapping depth ranges."""
-    
-    if not zones:
-        return []
-    
-    # Sort by start depth
-    zones = sorted(zones, key=lambda x: x[0])
+def _window(
+    depth: np.ndarray,
+    lo_val: float,
+    hi_val: float,
+    inclusive: str = 'both'
+) -> Tuple[int, int]:
+    """
+    Slice bounds of ``depth`` (ascending) between lo_val and hi_val.
     
-    merged = [zones[0]]
+    ``inclusive`` is 'both', 'left', 'right' or 'neither', as in
+    pandas.Series.between, so ``depth[lo:hi]`` equals the matching mask.
+    """
     
-    for current in zones[1:]:
-        last = merged[-1]
-        
-        # Check for overlap
-        if current[0] <= last[1]:
-            # Merge
-            merged[-1] = (last[0], max(last[1], current[1]))
-        else:
-            # No overlap
-            merged.append(current)
+    lo = np.searchsorted(depth, lo_val, side='left' if inclusive in ('both', 'left') else 'right')
+    hi = np.searchsorted(depth, hi_val, side='right' if inclusive in ('both', 'right') else 'left')
+    return lo, max(lo, hi)
+
+
+def _nanmean(values: np.ndarray) -> float:
+    """Mean ignoring NaN (as pandas does); NaN if nothing is left."""
     
-    return merged
+    values = values[~np.isnan(values)]
+    return values.mean() if values.size else np.nan
 
 
 # ============================================================================
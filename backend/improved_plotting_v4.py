@@ -10,11 +10,38 @@ Enhanced plotting functions for Spud-SRI V4 with:
 Use these functions in your Streamlit app (app_ui_v2.py)
 """
 
+import io
+import inspect
 import streamlit as st
-import matplotlib.pyplot as plt
 import pandas as pd
 import numpy as np
 
+# Altair renders client-side, so the interactive view avoids re-rasterising a
+# matplotlib figure on every rerun. Ships with Streamlit, but stay optional.
+try:
+    import altair as alt
+    ALTAIR_AVAILABLE = True
+except ImportError:
+    ALTAIR_AVAILABLE = False
+
+def _full_width(element) -> dict:
+    """
+    Keyword argument that makes a Streamlit element fill the container width.
+    Current Streamlit takes width="stretch" and deprecates use_container_width;
+    releases before that only know use_container_width (st.image: from 1.40,
+    use_column_width before it).
+    """
+    params = inspect.signature(element).parameters
+    width = params.get("width")
+    if width is not None and (isinstance(width.default, str) or "Width" in str(width.annotation)):
+        return {"width": "stretch"}
+    if "use_container_width" in params:
+        return {"use_container_width": True}
+    return {"use_column_width": True}
+
+_IMAGE_FULL_WIDTH = _full_width(st.image)
+_CHART_FULL_WIDTH = _full_width(st.altair_chart)
+
 def plot_penetration_curve_v4(
     df: pd.DataFrame,
     preload_MN: float,
@@ -52,12 +79,17 @@ def plot_penetration_curve_v4(
     fig, ax : matplotlib figure and axis objects
     """
     
+    # A bare Figure rather than plt.subplots(): no pyplot import, and nothing is
+    # left in pyplot's figure registry between reruns
+    from matplotlib.figure import Figure
+    
     # Create figure
-    fig, ax = plt.subplots(figsize=(fig_width, fig_height))
+    fig = Figure(figsize=(fig_width, fig_height))
+    ax = fig.subplots()
     
-    # Extract data
-    depths = df["depth"].values
-    real_capacity = df["real_MN"].values
+    # Extract data (float32 is plenty for a plot and halves what Agg is handed)
+    depths = df["depth"].to_numpy(dtype=np.float32)
+    real_capacity = df["real_MN"].to_numpy(dtype=np.float32)
     
     # Filter out NaN values
     valid_mask = ~np.isnan(real_capacity)
@@ -119,11 +151,75 @@ def plot_penetration_curve_v4(
     ax.legend(loc='lower right', fontsize=11, framealpha=0.9)
     
     # Tight layout
-    plt.tight_layout()
+    fig.tight_layout()
     
     return fig, ax
 
 
+def plot_penetration_curve_altair(
+    df: pd.DataFrame,
+    preload_MN: float,
+    tip_offset_m: float,
+    x_max: float = None,
+    y_max: float = None,
+    height: int = 480
+):
+    """
+    Interactive (client-side) version of plot_penetration_curve_v4.
+    
+    Same content: REAL curve, preload line and tip offset line. Requires
+    altair (see ALTAIR_AVAILABLE).
+    
+    Returns:
+    --------
+    alt.LayerChart
+    """
+    
+    long_df = df[["depth", "real_MN"]].dropna().rename(columns={"real_MN": "value"})
+    long_df["series"] = "REAL (governing)"
+    
+    x_scale = alt.Scale(domain=[0, x_max]) if x_max is not None else alt.Scale(zero=True)
+    y_scale = alt.Scale(domain=[0, y_max], reverse=True) if y_max is not None else alt.Scale(reverse=True)
+    
+    curve = alt.Chart(long_df).mark_line(strokeWidth=3, clip=True).encode(
+        x=alt.X("value:Q", title="Leg Load (MN)", scale=x_scale),
+        y=alt.Y("depth:Q", title="Penetration of widest section (m)", scale=y_scale),
+        color=alt.Color("series:N", title=None,
+                        scale=alt.Scale(range=["#1f77b4"]),
+                        legend=alt.Legend(orient="bottom-right")),
+        tooltip=[alt.Tooltip("depth:Q", format=".2f"), alt.Tooltip("value:Q", format=".2f")]
+    )
+    
+    preload = alt.Chart(pd.DataFrame({"x": [preload_MN]})).mark_rule(
+        color="red", strokeDash=[6, 4], strokeWidth=2
+    ).encode(x="x:Q")
+    
+    tip = alt.Chart(pd.DataFrame({"y": [tip_offset_m]})).mark_rule(
+        color="orange", strokeDash=[2, 2], strokeWidth=1.5
+    ).encode(y="y:Q")
+    
+    return (curve + preload + tip).properties(height=height).interactive()
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _render_v4_png(df: pd.DataFrame, preload_MN: float, tip_offset_m: float, rig_name: str,
+                   x_max, y_max, fig_width: float, fig_height: float) -> bytes:
+    """plot_penetration_curve_v4() rendered to PNG bytes (same settings as st.pyplot)."""
+    fig, ax = plot_penetration_curve_v4(
+        df=df,
+        preload_MN=preload_MN,
+        tip_offset_m=tip_offset_m,
+        rig_name=rig_name,
+        x_max=x_max,
+        y_max=y_max,
+        fig_width=fig_width,
+        fig_height=fig_height
+    )
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=200, bbox_inches="tight")
+    return buf.getvalue()
+
+
 def create_streamlit_plot_with_controls(df: pd.DataFrame, spud, results: dict):
     """
     Streamlit-integrated plotting function with interactive controls.
@@ -186,21 +282,27 @@ def create_streamlit_plot_with_controls(df: pd.DataFrame, spud, results: dict):
         fig_width = st.slider("Width", min_value=6, max_value=16, value=10, step=1)
         fig_height = st.slider("Height", min_value=6, max_value=16, value=8, step=1)
     
-    # Create the plot
-    fig, ax = plot_penetration_curve_v4(
-        df=df,
-        preload_MN=spud.preload_MN,
-        tip_offset_m=spud.tip_elev,
-        rig_name=spud.rig_name,
-        x_max=x_max,
-        y_max=y_max,
-        fig_width=fig_width,
-        fig_height=fig_height
-    )
-    
-    # Display in Streamlit
-    st.pyplot(fig)
-    plt.close(fig)
+    # Matplotlib only for export-quality output; otherwise the cheap Vega-Lite chart
+    high_res = st.checkbox("High-res figure", value=not ALTAIR_AVAILABLE, key="high_res_fig",
+                           disabled=not ALTAIR_AVAILABLE,
+                           help="Render the Matplotlib figure (slower, export quality).")
+    
+    if high_res:
+        # Figure build + rasterisation is cached on the inputs, so reruns that
+        # don't touch the plot controls reuse the PNG
+        png = _render_v4_png(df, spud.preload_MN, spud.tip_elev, spud.rig_name,
+                             x_max, y_max, fig_width, fig_height)
+        st.image(png, **_IMAGE_FULL_WIDTH)
+    else:
+        chart = plot_penetration_curve_altair(
+            df=df,
+            preload_MN=spud.preload_MN,
+            tip_offset_m=spud.tip_elev,
+            x_max=x_max,
+            y_max=y_max,
+            height=fig_height * 60
+        )
+        st.altair_chart(chart, **_CHART_FULL_WIDTH)
     
     # Add penetration results below plot
     st.write("---")
@@ -250,34 +352,21 @@ def add_failure_mode_annotations(ax, df: pd.DataFrame):
     st.pyplot(fig)
     """
     
-    depths = df["depth"].values
-    
-    # Find squeezing zones
-    squeeze_mask = df["squeezing_active"] == "YES"
-    if squeeze_mask.any():
-        squeeze_depths = depths[squeeze_mask]
-        if len(squeeze_depths) > 0:
-            y_min, y_max = squeeze_depths.min(), squeeze_depths.max()
-            ax.axhspan(y_min, y_max, alpha=0.2, color='yellow', 
-                      label='Squeezing zone')
-    
-    # Find clay/clay punch-through zones
-    punch_cc_mask = df["punch_clay_clay_active"] == "YES"
-    if punch_cc_mask.any():
-        punch_cc_depths = depths[punch_cc_mask]
-        if len(punch_cc_depths) > 0:
-            y_min, y_max = punch_cc_depths.min(), punch_cc_depths.max()
-            ax.axhspan(y_min, y_max, alpha=0.2, color='red', 
-                      label='Punch-through (clay/clay)')
-    
-    # Find sand/clay punch-through zones
-    punch_sc_mask = df["punch_sand_clay_active"] == "YES"
-    if punch_sc_mask.any():
-        punch_sc_depths = depths[punch_sc_mask]
-        if len(punch_sc_depths) > 0:
-            y_min, y_max = punch_sc_depths.min(), punch_sc_depths.max()
-            ax.axhspan(y_min, y_max, alpha=0.2, color='orange', 
-                      label='Punch-through (sand/clay)')
+    # Plain arrays once; boolean indexing below stays in NumPy
+    depths = df["depth"].to_numpy()
+    
+    # One span per contiguous run of active rows, so separate zones stay
+    # separate; only the first span of each mode carries the legend label
+    for col, color, label in (
+        ("squeezing_active", 'yellow', 'Squeezing zone'),
+        ("punch_clay_clay_active", 'red', 'Punch-through (clay/clay)'),
+        ("punch_sand_clay_active", 'orange', 'Punch-through (sand/clay)'),
+    ):
+        active = df[col].to_numpy() == "YES"
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], active, [0])).astype(np.int8)))
+        for i, (y_min, y_max) in enumerate(zip(depths[edges[0::2]], depths[edges[1::2] - 1])):
+            ax.axhspan(y_min, y_max, alpha=0.2, color=color, 
+                      label=label if i == 0 else '_nolegend_')
     
     # Update legend to include new items
     ax.legend(loc='lower right', fontsize=10, framealpha=0.9)
@@ -316,5 +405,4 @@ def example_streamlit_integration():
     
     # Display
     st.pyplot(fig)
-    plt.close(fig)
     """
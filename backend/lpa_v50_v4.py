@@ -17,11 +17,23 @@ All SNAME compliance corrections from V3 are preserved.
 """
 
 from __future__ import annotations
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
 from dataclasses import dataclass, field
+from functools import lru_cache
+from math import isfinite
 from typing import List, Tuple, Optional, Dict
+import sys
+import threading
 import numpy as np
 import pandas as pd
-from scipy import interpolate
+
+# Optional JIT for the profile kernels below; without numba they run as plain numpy
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
 
 # ---------------- Version 50 switches (user-togglable from UI) ----------------
 USE_MIN_CU_POINT_AVG_DEFAULT = True
@@ -265,6 +277,55 @@ NC_PRIME_TABLES = {
 ALPHA_VALUES = np.array([0.0, 0.2, 0.4, 0.6, 0.8, 1.0])
 
 
+def _nc_prime_cube(tables: Dict[int, np.ndarray]):
+    """
+    Stack the per-beta Nc' tables into one contiguous array indexed
+    [beta, rho, D, alpha], over the rho/D values found in the tables.
+    Cells a table does not list (and its blank alpha columns) are NaN; the
+    first row is used where a (rho, D) cell is listed twice.
+    """
+    betas = sorted(tables)
+    rho_vals = np.unique(np.concatenate([tables[b][:, 0] for b in betas]))
+    D_vals = np.unique(np.concatenate([tables[b][:, 1] for b in betas]))
+    cube = np.full((len(betas), len(rho_vals), len(D_vals), len(ALPHA_VALUES)), np.nan)
+    for k, b in enumerate(betas):
+        seen = set()
+        for row in tables[b]:
+            i = int(np.searchsorted(rho_vals, row[0]))
+            j = int(np.searchsorted(D_vals, row[1]))
+            if (i, j) not in seen:
+                seen.add((i, j))
+                cube[k, i, j] = row[2:8]
+    return betas, rho_vals, D_vals, cube
+
+# Table structure is fixed: laid out once at import instead of on every call
+_NC_BETAS, _NC_RHO, _NC_D, _NC_CUBE = _nc_prime_cube(NC_PRIME_TABLES)
+
+_NC_RHO_LIST = _NC_RHO.tolist()
+_NC_D_LIST = _NC_D.tolist()
+
+@lru_cache(maxsize=64)
+def _nc_grid(b: int, alpha: float) -> Tuple[Tuple[float, ...], ...]:
+    """Nc'[rho][D] of table `b` at this alpha (alpha is fixed per spudcan)."""
+    cells = _NC_CUBE[_NC_BETAS.index(b)]
+    nc_grid = np.zeros(cells.shape[:2])
+    for i, j in zip(*np.nonzero(~np.isnan(cells).all(axis=2))):
+        valid = ~np.isnan(cells[i, j])
+        # np.interp holds the end values outside the valid alphas
+        nc_grid[i, j] = np.interp(alpha, ALPHA_VALUES[valid], cells[i, j][valid])
+    return tuple(map(tuple, nc_grid.tolist()))
+
+def _bilinear(xs: List[float], ys: List[float], grid, x: float, y: float) -> float:
+    """Bilinear interpolation on a rectilinear grid[i][j] over xs[i], ys[j]."""
+    i = min(max(bisect_right(xs, x) - 1, 0), len(xs) - 2)
+    j = min(max(bisect_right(ys, y) - 1, 0), len(ys) - 2)
+    tx = (x - xs[i]) / (xs[i+1] - xs[i])
+    ty = (y - ys[j]) / (ys[j+1] - ys[j])
+    lo = grid[i][j] + tx * (grid[i+1][j] - grid[i][j])
+    hi = grid[i][j+1] + tx * (grid[i+1][j+1] - grid[i][j+1])
+    return lo + ty * (hi - lo)
+
+
 def interpolate_nc_prime(beta: float, alpha: float, D_over_2R: float,
                         rho2R_over_cum: float) -> float:
     """Interpolate Nc' value from SNAME tables C6.1-C6.6."""
@@ -273,41 +334,15 @@ def interpolate_nc_prime(beta: float, alpha: float, D_over_2R: float,
     D_over_2R = min(2.5, max(0.0, D_over_2R))
     rho2R_over_cum = min(5.0, max(0.0, rho2R_over_cum))
     
-    available_betas = sorted(NC_PRIME_TABLES.keys())
-    if beta in available_betas:
+    if beta in _NC_BETAS:
         beta_lower = beta_upper = beta
     else:
-        beta_upper = min([b for b in available_betas if b >= beta])
-        beta_lower = max([b for b in available_betas if b <= beta])
+        beta_upper = min([b for b in _NC_BETAS if b >= beta])
+        beta_lower = max([b for b in _NC_BETAS if b <= beta])
     
     def get_nc_for_beta(b: float) -> float:
-        table = NC_PRIME_TABLES[int(b)]
-        rho_vals = np.unique(table[:, 0])
-        D_vals = np.unique(table[:, 1])
-        nc_grid = np.zeros((len(rho_vals), len(D_vals)))
-        
-        for i, rho in enumerate(rho_vals):
-            for j, D in enumerate(D_vals):
-                row_mask = (table[:, 0] == rho) & (table[:, 1] == D)
-                if not np.any(row_mask):
-                    continue
-                
-                row = table[row_mask][0]
-                nc_values = row[2:8]
-                valid_mask = ~np.isnan(nc_values)
-                if np.any(valid_mask):
-                    valid_alphas = ALPHA_VALUES[valid_mask]
-                    valid_ncs = nc_values[valid_mask]
-                    
-                    if alpha <= valid_alphas[0]:
-                        nc_grid[i, j] = valid_ncs[0]
-                    elif alpha >= valid_alphas[-1]:
-                        nc_grid[i, j] = valid_ncs[-1]
-                    else:
-                        nc_grid[i, j] = np.interp(alpha, valid_alphas, valid_ncs)
-        
-        interp_func = interpolate.RectBivariateSpline(rho_vals, D_vals, nc_grid, kx=1, ky=1)
-        return float(interp_func(rho2R_over_cum, D_over_2R)[0, 0])
+        return _bilinear(_NC_RHO_LIST, _NC_D_LIST, _nc_grid(int(b), float(alpha)),
+                         float(rho2R_over_cum), float(D_over_2R))
     
     nc_lower = get_nc_for_beta(beta_lower)
     if beta_lower == beta_upper:
@@ -319,7 +354,11 @@ def interpolate_nc_prime(beta: float, alpha: float, D_over_2R: float,
 
 
 # ---------------- Data models ----------------
-@dataclass
+# Inputs are read thousands of times per sweep and never modified: frozen,
+# and slotted where the interpreter supports dataclass(slots=True) (3.10+)
+_DATACLASS_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+@dataclass(frozen=True, **_DATACLASS_SLOTS)
 class Spudcan:
     rig_name: str
     B: float
@@ -331,10 +370,13 @@ class Spudcan:
 
 @dataclass
 class SoilPoint:
+    # Profiles hold thousands of points: no per-instance __dict__ (dataclass(slots=True)
+    # needs Python 3.10, so the slots are declared by hand)
+    __slots__ = ("z", "v")
     z: float
     v: float
 
-@dataclass
+@dataclass(frozen=True, **_DATACLASS_SLOTS)
 class SoilLayer:
     name: str
     z_top: float
@@ -344,10 +386,39 @@ class SoilLayer:
     su:    List[SoilPoint] = field(default_factory=list)
     phi:   List[SoilPoint] = field(default_factory=list)
 
+    @classmethod
+    def from_arrays(cls, name: str, z_top: float, z_bot: float, soil_type: str,
+                    gamma=None, su=None, phi=None) -> "SoilLayer":
+        """Build a layer from (N, 2) depth/value arrays instead of SoilPoint lists."""
+        return cls(name=name, z_top=float(z_top), z_bot=float(z_bot), soil_type=soil_type,
+                   gamma=_points_from_array(gamma), su=_points_from_array(su),
+                   phi=_points_from_array(phi))
+
+def _points_from_array(arr) -> List[SoilPoint]:
+    if arr is None:
+        return []
+    arr = np.asarray(arr, dtype=float).reshape(-1, 2)
+    return list(map(SoilPoint, arr[:, 0].tolist(), arr[:, 1].tolist()))
+
 # ---------------- Helpers ----------------
+# Per-sweep precomputed profile data (see _precomputed_profiles); thread-local
+# because Streamlit runs each session's script in its own thread.
+_sweep = threading.local()
+
 def _interp(depth: float, prof: List[SoilPoint]) -> float:
     if not prof:
         return np.nan
+    pre = getattr(_sweep, "profiles", None)
+    entry = pre.get(id(prof)) if pre is not None else None
+    if entry is not None and entry[0] is prof:
+        pz, pv = entry[3], entry[4]
+        i = bisect_left(pz, depth)
+        if i == 0:
+            return pv[0]
+        if i == len(pz):
+            return pv[-1]
+        z1, v1, z2, v2 = pz[i-1], pv[i-1], pz[i], pv[i]
+        return v1 + (depth - z1) * (v2 - v1) / (z2 - z1)
     prof = sorted(prof, key=lambda p: p.z)
     if depth <= prof[0].z:
         return prof[0].v
@@ -360,45 +431,266 @@ def _interp(depth: float, prof: List[SoilPoint]) -> float:
             return v1 + (depth - z1) * (v2 - v1) / (z2 - z1)
     return prof[-1].v
 
+def _prof_arrays(prof: List[SoilPoint]) -> Tuple[np.ndarray, np.ndarray]:
+    """(z, v) arrays of a profile, stably sorted by depth as _interp() sees it."""
+    pre = getattr(_sweep, "profiles", None)
+    entry = pre.get(id(prof)) if pre is not None else None
+    if entry is not None and entry[0] is prof:
+        return entry[1], entry[2]
+    prof = sorted(prof, key=lambda p: p.z)
+    return (np.array([p.z for p in prof], dtype=float),
+            np.array([p.v for p in prof], dtype=float))
+
+def _interp_sorted_np(zs: np.ndarray, pz: np.ndarray, pv: np.ndarray) -> np.ndarray:
+    # Segment i is the first point with zs <= pz[i], exactly as in _interp()
+    i = np.searchsorted(pz, zs, side="left")
+    j = np.clip(i, 1, len(pz) - 1)
+    z1, z2, v1, v2 = pz[j-1], pz[j], pv[j-1], pv[j]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        vals = v1 + (zs - z1) * (v2 - v1) / (z2 - z1)
+    vals = np.where(i == 0, pv[0], vals)
+    return np.where(i >= len(pz), pv[-1], vals)
+
+# _interp() evaluated at every depth in zs for a depth-sorted (pz, pv) profile
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _interp_sorted(zs, pz, pv):
+        out = np.empty(zs.shape[0])
+        n = pz.shape[0]
+        for k in range(zs.shape[0]):
+            d = zs[k]
+            if d <= pz[0]:
+                out[k] = pv[0]
+                continue
+            out[k] = pv[n-1]
+            for i in range(1, n):
+                if d <= pz[i]:
+                    out[k] = pv[i-1] + (d - pz[i-1]) * (pv[i] - pv[i-1]) / (pz[i] - pz[i-1])
+                    break
+        return out
+else:
+    _interp_sorted = _interp_sorted_np
+
+def _window_means(starts: np.ndarray, width: float, pz: np.ndarray, pv: np.ndarray,
+                  dz: float = 0.05) -> np.ndarray:
+    """
+    _avg_over(z, z + width) for every z in starts with one interpolation pass:
+    the np.arange samples of all windows are laid end to end and reduced per window.
+    """
+    stops = starts + width
+    # Same sample count and values as np.arange(z1, z2 + 1e-9, dz) for each window
+    counts = np.ceil((stops + 1e-9 - starts) / dz).astype(np.intp)
+    offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    steps = np.arange(counts.sum()) - np.repeat(offsets, counts)
+    zs = np.repeat(starts, counts) + steps * np.repeat((starts + dz) - starts, counts)
+    vals = _interp_sorted(zs, pz, pv)
+    ok = ~np.isnan(vals)
+    sums = np.add.reduceat(np.where(ok, vals, 0.0), offsets)
+    n_ok = np.add.reduceat(ok.astype(np.intp), offsets)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(n_ok > 0, sums / n_ok, np.nan)
+
 def _avg_over(z1: float, z2: float, prof: List[SoilPoint], dz: float = 0.05) -> float:
     if not prof or z2 <= z1:
         return np.nan
+    pre = getattr(_sweep, "windows", None)
+    entry = pre.get(id(prof)) if pre is not None and dz == 0.05 else None
+    if entry is not None and entry[0] is prof:
+        mean = entry[1].get((z1, z2))
+        if mean is not None:
+            return mean
     zs = np.arange(z1, z2 + 1e-9, dz)
-    vals = np.array([_interp(z, prof) for z in zs], dtype=float)
+    vals = _interp_sorted(zs, *_prof_arrays(prof))
     vals = vals[~np.isnan(vals)]
     return float(vals.mean()) if vals.size else np.nan
 
+def _layer_owner(zs: np.ndarray, layers: List[SoilLayer]) -> np.ndarray:
+    """_layer_index() for every depth in zs at once."""
+    bounds = _ordered_bounds(layers)
+    if bounds is not None:
+        # Same candidate rule as the scalar bisect in _layer_index
+        tops = np.asarray(bounds[0], dtype=np.float64)
+        bots = np.asarray(bounds[1], dtype=np.float64)
+        i = np.searchsorted(tops, zs, side="right") - 1
+        hit = (i >= 0) & (zs < bots[np.maximum(i, 0)])
+        return np.where(hit, i, len(layers) - 1)
+    owner = np.full(zs.shape, len(layers) - 1)
+    for i in range(len(layers) - 1, -1, -1):
+        owner[(layers[i].z_top <= zs) & (zs < layers[i].z_bot)] = i
+    return owner
+
+# Integer soil classes for the sweep loops; clay and silt (both undrained) sort
+# first so a single compare tests for either
+_SOIL_CLAY, _SOIL_SILT, _SOIL_SAND, _SOIL_OTHER = 0, 1, 2, 3
+_SOIL_CODES = {"clay": _SOIL_CLAY, "silt": _SOIL_SILT, "sand": _SOIL_SAND}
+
+def _soil_codes(layers: List[SoilLayer]) -> np.ndarray:
+    """Soil class code of every layer (_SOIL_OTHER for anything unrecognised)."""
+    return np.array([_SOIL_CODES.get(L.soil_type, _SOIL_OTHER) for L in layers], dtype=np.int8)
+
+def _ordered_bounds(layers: List[SoilLayer]) -> Optional[Tuple[list, list]]:
+    """(tops, bottoms) lists when layers are sorted and non-overlapping, else None."""
+    tops = [L.z_top for L in layers]
+    bots = [L.z_bot for L in layers]
+    if not layers or any(np.isnan(tops + bots)):
+        return None
+    for i in range(len(layers) - 1):
+        if tops[i] > tops[i + 1] or bots[i] > tops[i + 1]:
+            return None
+    return tops, bots
+
 def _layer_index(z: float, layers: List[SoilLayer]) -> int:
+    pre = getattr(_sweep, "owners", None)
+    if pre is not None and pre[0] is layers:
+        i = pre[1].get(z)
+        if i is not None:
+            return i
+        if pre[2] is not None:
+            # Ordered layers: the only candidate is the last one starting at or above z
+            tops, bots = pre[2]
+            i = bisect_right(tops, z) - 1
+            return i if i >= 0 and z < bots[i] else len(layers) - 1
     for i, L in enumerate(layers):
         if L.z_top <= z < L.z_bot:
             return i
     return len(layers) - 1
 
-def _has_su_here(z: float, layers: List[SoilLayer]) -> bool:
-    i = _layer_index(z, layers)
-    val = _interp(z, layers[i].su)
-    return np.isfinite(val) and val > 0
-
-def _has_phi_here(z: float, layers: List[SoilLayer]) -> bool:
-    i = _layer_index(z, layers)
-    val = _interp(z, layers[i].phi)
-    return np.isfinite(val) and val > 0
-
 def _gamma_prime(z: float, layers: List[SoilLayer]) -> float:
     i = _layer_index(z, layers)
     return _interp(z, layers[i].gamma)
 
+def _gammas_at(zs: np.ndarray, layers: List[SoilLayer]) -> np.ndarray:
+    """γ' of the owning layer at each depth (first layer with z_top <= z < z_bot,
+    else the last one, as in _layer_index); 0 where that layer has no γ' points."""
+    owner = _layer_owner(zs, layers)
+    gammas = np.full(zs.shape, np.nan)
+    for i in np.unique(owner):
+        if layers[i].gamma:
+            m = owner == i
+            gammas[m] = _interp_sorted(zs[m], *_prof_arrays(layers[i].gamma))
+    gammas[np.isnan(gammas)] = 0.0
+    return gammas
+
+def _owner_profile_at(depths: np.ndarray, owner: np.ndarray, layers: List[SoilLayer],
+                      attr: str) -> np.ndarray:
+    """_interp() of the owning layer's `attr` profile at each depth (NaN if it has none)."""
+    vals = np.full(depths.shape, np.nan)
+    for i, L in enumerate(layers):
+        prof = getattr(L, attr)
+        m = owner == i
+        if prof and m.any():
+            vals[m] = _interp_sorted(depths[m], *_prof_arrays(prof))
+    return vals
+
+def _owner_window_means(depths: np.ndarray, owner: np.ndarray, layers: List[SoilLayer],
+                        attr: str) -> np.ndarray:
+    """
+    _avg_over(z, z + B/2) of the owning layer's `attr` profile at each sweep
+    depth, read from the current sweep's batched windows (NaN where the
+    layer has no such profile).
+    """
+    pre = getattr(_sweep, "windows", None) or {}
+    means = np.full(depths.shape, np.nan)
+    for i, L in enumerate(layers):
+        prof = getattr(L, attr)
+        m = owner == i
+        entry = pre.get(id(prof)) if prof else None
+        if entry is not None and entry[0] is prof and m.any():
+            means[m] = entry[3][np.searchsorted(entry[2], depths[m])]
+    return means
+
 def _overburden(z: float, layers: List[SoilLayer], dz: float = 0.1) -> float:
     if z <= 0:
         return 0.0
+    pre = getattr(_sweep, "overburden", None)
+    if pre is not None and pre[0] is layers and dz == 0.1:
+        # np.arange(0, z, dz) is a prefix of the precomputed grid, sample for
+        # sample, so the trapezoid over it is an entry of the running integral
+        n = int(np.ceil((z + 1e-9) / dz))
+        if n <= pre[1].size:
+            return float(pre[1][n - 1])
     zs = np.arange(0.0, z + 1e-9, dz)
-    gammas = np.array([_gamma_prime(zi, layers) for zi in zs], dtype=float)
-    gammas[np.isnan(gammas)] = 0.0
-    return float(np.trapz(gammas, zs))
+    return float(np.trapz(_gammas_at(zs, layers), zs))
+
+def _overburdens(zs: np.ndarray, layers: List[SoilLayer], dz: float = 0.1) -> np.ndarray:
+    """_overburden() at every depth in zs, read from the sweep's running integral."""
+    pre = getattr(_sweep, "overburden", None)
+    if pre is None or pre[0] is not layers or dz != 0.1:
+        return np.array([_overburden(z, layers, dz) for z in zs.tolist()], dtype=float)
+    n = np.ceil((zs + 1e-9) / dz).astype(np.int64)
+    inside = (zs > 0) & (n <= pre[1].size)
+    p0 = np.where(inside, pre[1][np.clip(n - 1, 0, pre[1].size - 1)], 0.0)
+    for k in np.flatnonzero((zs > 0) & ~inside):
+        p0[k] = _overburden(float(zs[k]), layers, dz)
+    return p0
+
+@contextmanager
+def _precomputed_profiles(layers: List[SoilLayer], max_depth: float, depths: np.ndarray,
+                          half_width: Optional[float] = None):
+    """
+    For the duration of one sweep, keep every profile's depth-sorted arrays,
+    the owning layer of each sweep depth, and the running trapezoid integral
+    of γ' over the overburden grid (0.1 m, down to the deepest depth a
+    capacity check can ask for), instead of rebuilding them at each depth.
+
+    With half_width (B/2), the _avg_over(z, z + B/2) means the sweep asks
+    for are also batched up front: the owning layer's su/γ' at each depth and
+    the underlying layer's su just below each layer bottom. clay_capacity()
+    results are memoised for the same duration, and the mudline su behind
+    every Nc' lookup is read once.
+    """
+    profiles = {}
+    for L in layers:
+        for prof in (L.gamma, L.su, L.phi):
+            if prof:
+                pz, pv = _prof_arrays(prof)
+                profiles[id(prof)] = (prof, pz, pv, pz.tolist(), pv.tolist())
+    outer = (getattr(_sweep, "profiles", None), getattr(_sweep, "overburden", None),
+             getattr(_sweep, "owners", None), getattr(_sweep, "windows", None),
+             getattr(_sweep, "clay", None), getattr(_sweep, "c_um", None))
+    _sweep.profiles = profiles
+    owner = _layer_owner(depths, layers)
+    _sweep.owners = (layers, dict(zip(depths.tolist(), owner.tolist())), _ordered_bounds(layers))
+    z_max = max([max_depth] + [L.z_bot for L in layers if isfinite(L.z_bot)])
+    grid = np.arange(0.0, z_max + 1e-9, 0.1)
+    g = _gammas_at(grid, layers)
+    cum = np.concatenate(([0.0], np.cumsum(np.diff(grid) * (g[1:] + g[:-1]) / 2.0)))
+    _sweep.overburden = (layers, cum)
+    windows = {}
+    if half_width is not None and half_width > 0:
+        starts: Dict[int, list] = {}
+        for i, L in enumerate(layers):
+            own = depths[owner == i]
+            for prof in (L.su, L.gamma):
+                if prof and own.size:
+                    starts.setdefault(id(prof), []).append(own)
+            if i + 1 < len(layers) and layers[i + 1].su and isfinite(L.z_bot):
+                starts.setdefault(id(layers[i + 1].su), []).append(np.array([L.z_bot]))
+        for key, parts in starts.items():
+            prof, pz, pv = profiles[key][:3]
+            z1 = np.unique(np.concatenate(parts))
+            means = _window_means(z1, half_width, pz, pv)
+            windows[key] = (prof, dict(zip(zip(z1.tolist(), (z1 + half_width).tolist()),
+                                           means.tolist())), z1, means)
+    _sweep.windows = windows
+    _sweep.clay = (layers, {})
+    _sweep.c_um = (layers, _surface_su(layers))
+    try:
+        yield
+    finally:
+        (_sweep.profiles, _sweep.overburden, _sweep.owners, _sweep.windows,
+         _sweep.clay, _sweep.c_um) = outer
+
+def _surface_su(layers: List[SoilLayer]) -> float:
+    """su at the mudline (z = 0), the c_um of the rho·2R/c_um ratio."""
+    pre = getattr(_sweep, "c_um", None)
+    if pre is not None and pre[0] is layers:
+        return pre[1]
+    return _interp(0.0, layers[_layer_index(0.0, layers)].su)
 
 def _calculate_rho_2R_over_cum(z: float, B: float, layers: List[SoilLayer]) -> float:
-    c_um = _interp(0.0, layers[_layer_index(0.0, layers)].su)
-    if not np.isfinite(c_um) or c_um <= 0:
+    c_um = _surface_su(layers)
+    if not isfinite(c_um) or c_um <= 0:
         return 0.0
     
     z1 = z
@@ -407,7 +699,7 @@ def _calculate_rho_2R_over_cum(z: float, B: float, layers: List[SoilLayer]) -> f
     su1 = _interp(z1, layers[_layer_index(z1, layers)].su)
     su2 = _interp(z2, layers[_layer_index(z2, layers)].su)
     
-    if not np.isfinite(su1) or not np.isfinite(su2):
+    if not isfinite(su1) or not isfinite(su2):
         return 0.0
     
     rho = (su2 - su1) / max(z2 - z1, 1e-6)
@@ -418,18 +710,22 @@ _DEFAULT_MEYERHOF = pd.DataFrame({
     "N":        [0.0,  2.0,  3.0,  3.6,  4.0,  4.7,  5.1],
 })
 
-def _meyerhof_N(d_over_B: float, table: Optional[pd.DataFrame]) -> float:
+def _meyerhof_N_all(d_over_B: np.ndarray, table: Optional[pd.DataFrame]) -> np.ndarray:
+    """Meyerhof N at every D/B in d_over_B (held at the end values outside the table)."""
     df = table if table is not None else _DEFAULT_MEYERHOF
     x = np.asarray(df["D_over_B"], dtype=float)
     y = np.asarray(df["N"], dtype=float)
-    if d_over_B <= x[0]:
-        return float(y[0])
-    if d_over_B >= x[-1]:
-        return float(y[-1])
-    j = np.searchsorted(x, d_over_B)
+    d_over_B = np.asarray(d_over_B, dtype=float)
+    j = np.clip(np.searchsorted(x, d_over_B), min(1, len(x) - 1), len(x) - 1)
     x1, x2 = x[j-1], x[j]
     y1, y2 = y[j-1], y[j]
-    return float(y1 + (d_over_B - x1) * (y2 - y1) / (x2 - x1))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        N = y1 + (d_over_B - x1) * (y2 - y1) / (x2 - x1)
+    N = np.where(d_over_B >= x[-1], y[-1], N)
+    return np.where(d_over_B <= x[0], y[0], N)
+
+def _meyerhof_N(d_over_B: float, table: Optional[pd.DataFrame]) -> float:
+    return float(_meyerhof_N_all(np.array([d_over_B]), table)[0])
 
 def _Nq(phi_rad: float) -> float:
     return np.exp(np.pi * np.tan(phi_rad)) * np.tan(np.pi/4 + phi_rad/2)**2
@@ -440,6 +736,19 @@ def _Ngamma(phi_rad: float) -> float:
 # ---------------- Capacities (kN) ----------------
 def clay_capacity(spud: Spudcan, z: float, layers: List[SoilLayer],
                   use_min_cu: bool, backflow_zero: bool) -> Optional[float]:
+    # Within a sweep the same clay capacity is asked for repeatedly (the
+    # sand/clay punch-through base at the layer bottom, the clay/clay upper
+    # bound at z), so results are memoised for the duration of the sweep
+    memo = getattr(_sweep, "clay", None)
+    if memo is None or memo[0] is not layers:
+        return _clay_capacity(spud, z, layers, use_min_cu, backflow_zero)
+    key = (z, use_min_cu, backflow_zero, spud.B, spud.A, spud.tip_elev, spud.beta, spud.alpha)
+    if key not in memo[1]:
+        memo[1][key] = _clay_capacity(spud, z, layers, use_min_cu, backflow_zero)
+    return memo[1][key]
+
+def _clay_capacity(spud: Spudcan, z: float, layers: List[SoilLayer],
+                   use_min_cu: bool, backflow_zero: bool) -> Optional[float]:
     B, A = spud.B, spud.A
     if B <= 0 or A <= 0:
         return None
@@ -448,14 +757,14 @@ def clay_capacity(spud: Spudcan, z: float, layers: List[SoilLayer],
         return 0.0
     
     i = _layer_index(z, layers)
-    if not _has_su_here(z, layers):
+    cu_point = _interp(z, layers[i].su)
+    if not (isfinite(cu_point) and cu_point > 0):
         return None
     
-    cu_point = _interp(z, layers[i].su)
     cu_avg   = _avg_over(z, z + B/2.0, layers[i].su)
     cu_eff   = np.nanmin([cu_point, cu_avg]) if use_min_cu else cu_avg
     
-    if not np.isfinite(cu_eff) or cu_eff <= 0:
+    if not isfinite(cu_eff) or cu_eff <= 0:
         return None
     
     if spud.beta is not None and spud.alpha is not None:
@@ -487,22 +796,49 @@ def sand_capacity(spud: Spudcan, z: float, layers: List[SoilLayer],
         return 0.0
     
     i = _layer_index(z, layers)
-    if not _has_phi_here(z, layers):
-        return None
     phi = _interp(z, layers[i].phi)
-    if not np.isfinite(phi) or phi <= 0:
+    if not isfinite(phi) or phi <= 0:
         return None
     if apply_phi_reduction:
         phi = max(0.0, phi - 5.0)
     phi_rad = np.deg2rad(phi)
     Nq = _Nq(phi_rad)
     Ng = _Ngamma(phi_rad)
-    gamma_p = _gamma_prime(z, layers)
+    gamma_p = _interp(z, layers[i].gamma)
     p0 = _overburden(z, layers)
     sq, sg, dq, dg = 1.0 + np.tan(phi_rad), 0.6, 1.0 + 2.0*np.tan(phi_rad)*(1-np.sin(phi_rad))**2*(z/max(B,1e-6)), 1.0
     Fv = (0.5 * gamma_p * B * Ng * sg * dg + p0 * Nq * sq * dq) * A
     return float(max(Fv, 0.0))
 
+def sand_capacities(spud: Spudcan, depths: np.ndarray, layers: List[SoilLayer],
+                    apply_phi_reduction: bool) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    sand_capacity() at every depth in one pass. Returns (Fv, valid): Fv in kN,
+    valid False where sand_capacity() would return None (Fv is NaN there).
+    """
+    n = depths.size
+    B, A = spud.B, spud.A
+    if B <= 0 or A <= 0:
+        return np.full(n, np.nan), np.zeros(n, dtype=bool)
+    above = depths < spud.tip_elev
+    owner = _layer_owner(depths, layers)
+    phi = _owner_profile_at(depths, owner, layers, "phi")
+    valid = above | (np.isfinite(phi) & (phi > 0))
+    if apply_phi_reduction:
+        phi = np.where(phi - 5.0 > 0.0, phi - 5.0, 0.0)
+    phi_rad = np.deg2rad(phi)
+    Nq = _Nq(phi_rad)
+    Ng = _Ngamma(phi_rad)
+    gamma_p = _owner_profile_at(depths, owner, layers, "gamma")
+    p0 = _overburdens(depths, layers)
+    tan_phi = np.tan(phi_rad)
+    sq, sg, dq, dg = 1.0 + tan_phi, 0.6, 1.0 + 2.0*tan_phi*(1-np.sin(phi_rad))**2*(depths/max(B,1e-6)), 1.0
+    with np.errstate(invalid="ignore"):
+        Fv = (0.5 * gamma_p * B * Ng * sg * dg + p0 * Nq * sq * dq) * A
+        Fv = np.where(0.0 > Fv, 0.0, Fv)  # max(Fv, 0.0), NaN kept
+    Fv = np.where(above, 0.0, np.where(valid, Fv, np.nan))
+    return Fv, valid
+
 def squeeze_capacity(spud: Spudcan, z: float, layers: List[SoilLayer],
                      enforce_trigger: bool, backflow_zero: bool) -> Optional[float]:
     if z < spud.tip_elev:
@@ -517,7 +853,7 @@ def squeeze_capacity(spud: Spudcan, z: float, layers: List[SoilLayer],
     B, A = spud.B, spud.A
     cu_t = _avg_over(z, z + B/2.0, top.su)
     cu_b = _avg_over(top.z_bot, top.z_bot + B/2.0, bot.su)
-    if not np.isfinite(cu_t) or not np.isfinite(cu_b):
+    if not isfinite(cu_t) or not isfinite(cu_b):
         return None
     if cu_b <= 1.5 * cu_t:
         return None
@@ -548,7 +884,7 @@ def punchthrough_capacity(spud: Spudcan, z: float, layers: List[SoilLayer],
     if top.soil_type in ("clay","silt") and bot.soil_type in ("clay","silt"):
         cu_t = _avg_over(z, z + B/2.0, top.su)
         cu_b = _avg_over(top.z_bot, top.z_bot + B/2.0, bot.su)
-        if not np.isfinite(cu_t) or not np.isfinite(cu_b):
+        if not isfinite(cu_t) or not isfinite(cu_b):
             return None
         if cu_t <= cu_b:
             return None
@@ -569,7 +905,7 @@ def punchthrough_capacity(spud: Spudcan, z: float, layers: List[SoilLayer],
         gamma_s = _gamma_prime(top.z_bot, layers)
         p0_s   = _overburden(z, layers)
         cu_c   = _avg_over(top.z_bot, top.z_bot + B/2.0, bot.su)
-        if not np.isfinite(gamma_s) or not np.isfinite(cu_c):
+        if not isfinite(gamma_s) or not isfinite(cu_c):
             return None
         KsTanPhi = (3.0 * cu_c) / (max(B,1e-6) * max(gamma_s,1e-6))
         Fv = Fv_b - A * H * gamma_s + 2.0 * (H/max(B,1e-6)) * (H*gamma_s + 2.0*p0_s) * KsTanPhi * A
@@ -579,6 +915,13 @@ def punchthrough_capacity(spud: Spudcan, z: float, layers: List[SoilLayer],
 
 # ============== VERSION 4: FAILURE MODE DETECTION ==============
 
+def _depth_grid(max_depth: float, dz: float) -> np.ndarray:
+    """Sweep depths 0, dz, 2·dz, ... up to max_depth, rounded to 1e-6 m to
+    strip float noise (3 * 0.1 -> 0.3)."""
+    n = int(np.floor(max_depth / dz)) + 1
+    return np.round(np.arange(n) * dz, 6)
+
+
 def detect_failure_modes(
     spud: Spudcan,
     layers: List[SoilLayer],
@@ -600,83 +943,82 @@ def detect_failure_modes(
     - punch_sand_clay_depth_start: float or None
     - punch_sand_clay_depth_end: float or None
     """
-    n = int(np.floor(max_depth / dz)) + 1
-    depths = np.round(np.linspace(0.0, n*dz, n+1)[:n], 6)
+    depths = _depth_grid(max_depth, dz)
+    n = depths.size
     
-    # Track failure modes
-    squeeze_depths = []
-    punch_cc_depths = []  # clay over clay
-    punch_sc_depths = []  # sand over clay
+    # Track failure modes, one flag per depth
+    squeeze_hit = np.zeros(n, dtype=bool)
+    punch_cc_hit = np.zeros(n, dtype=bool)  # clay over clay
+    punch_sc_hit = np.zeros(n, dtype=bool)  # sand over clay
     
-    for z in depths:
-        # Check squeezing
-        idx = _layer_index(z, layers)
-        if idx + 1 < len(layers):
+    owner = _layer_owner(depths, layers).tolist()
+    B = spud.B
+    half_B = B/2.0
+    n_layers = len(layers)
+    codes = _soil_codes(layers).tolist()
+    
+    with _precomputed_profiles(layers, max_depth, depths, half_B):
+        for k, z in enumerate(depths.tolist()):
+            idx = owner[k]
+            if idx + 1 >= n_layers:
+                continue
             top, bot = layers[idx], layers[idx+1]
-            
-            # Squeezing check (soft over strong clay)
-            if top.soil_type in ("clay", "silt") and bot.soil_type in ("clay", "silt"):
-                cu_t = _avg_over(z, z + spud.B/2.0, top.su)
-                cu_b = _avg_over(top.z_bot, top.z_bot + spud.B/2.0, bot.su)
-                
-                if np.isfinite(cu_t) and np.isfinite(cu_b) and cu_b > 1.5 * cu_t:
-                    T = top.z_bot - z
-                    if T > 0:
-                        trigger_ok = True
-                        if squeeze_trigger:
-                            trigger_ok = spud.B >= 3.45 * T * (1.0 + 1.025 * (z / max(spud.B,1e-6)))
-                        
-                        if trigger_ok:
-                            squeeze_depths.append(z)
-            
-            # Punch-through clay/clay check (strong over weak)
-            if top.soil_type in ("clay", "silt") and bot.soil_type in ("clay", "silt"):
-                cu_t = _avg_over(z, z + spud.B/2.0, top.su)
-                cu_b = _avg_over(top.z_bot, top.z_bot + spud.B/2.0, bot.su)
-                
-                if np.isfinite(cu_t) and np.isfinite(cu_b) and cu_t > cu_b:
-                    punch_cc_depths.append(z)
-            
-            # Punch-through sand/clay check
+            top_code = codes[idx]
+            bot_clay = codes[idx+1] <= _SOIL_SILT
+        
+            if top_code <= _SOIL_SILT and bot_clay:
+                cu_t = _avg_over(z, z + half_B, top.su)
+                cu_b = _avg_over(top.z_bot, top.z_bot + half_B, bot.su)
+                if isfinite(cu_t) and isfinite(cu_b):
+                    # Squeezing check (soft over strong clay)
+                    if cu_b > 1.5 * cu_t:
+                        T = top.z_bot - z
+                        if T > 0:
+                            trigger_ok = True
+                            if squeeze_trigger:
+                                trigger_ok = B >= 3.45 * T * (1.0 + 1.025 * (z / max(B,1e-6)))
+                            squeeze_hit[k] = trigger_ok
+                    # Punch-through clay/clay check (strong over weak)
+                    punch_cc_hit[k] = cu_t > cu_b
+        
             # Punch-through sand/clay check - CORRECTED
-            if top.soil_type == "sand" and bot.soil_type in ("clay", "silt"):
-                H = top.z_bot - z
-                if H > 0:
-                    # Calculate capacities to compare
-                    Fpt = punchthrough_capacity(spud, z, layers, backflow_zero=False)
-                    Fs = sand_capacity(spud, z, layers, apply_phi_reduction=False)
-                    
-                    # Only flag if punch capacity < sand capacity
-                    if Fpt is not None and Fs is not None and Fpt < Fs:
-                        punch_sc_depths.append(z)
-            #if top.soil_type == "sand" and bot.soil_type in ("clay", "silt"):
-                #'H = top.z_bot - z
-                #'if H > 0:
-                 #   'punch_sc_depths.append(z)
-    
+            elif top_code == _SOIL_SAND and bot_clay and top.z_bot - z > 0:
+                # Calculate capacities to compare
+                Fpt = punchthrough_capacity(spud, z, layers, backflow_zero=False)
+                Fs = sand_capacity(spud, z, layers, apply_phi_reduction=False)
+                # Only flag if punch capacity < sand capacity
+                punch_sc_hit[k] = Fpt is not None and Fs is not None and Fpt < Fs
+
     # Consolidate continuous ranges
-    def get_range(depths_list):
-        if not depths_list:
+    def get_range(hit):
+        if not hit.any():
             return None, None
-        return min(depths_list), max(depths_list)
+        return depths[hit].min(), depths[hit].max()
     
-    sq_start, sq_end = get_range(squeeze_depths)
-    pcc_start, pcc_end = get_range(punch_cc_depths)
-    psc_start, psc_end = get_range(punch_sc_depths)
+    sq_start, sq_end = get_range(squeeze_hit)
+    pcc_start, pcc_end = get_range(punch_cc_hit)
+    psc_start, psc_end = get_range(punch_sc_hit)
     
     return {
-        "squeezing_detected": len(squeeze_depths) > 0,
+        "squeezing_detected": bool(squeeze_hit.any()),
         "squeezing_depth_start": sq_start,
         "squeezing_depth_end": sq_end,
-        "punch_clay_clay_detected": len(punch_cc_depths) > 0,
+        "punch_clay_clay_detected": bool(punch_cc_hit.any()),
         "punch_clay_clay_depth_start": pcc_start,
         "punch_clay_clay_depth_end": pcc_end,
-        "punch_sand_clay_detected": len(punch_sc_depths) > 0,
+        "punch_sand_clay_detected": bool(punch_sc_hit.any()),
         "punch_sand_clay_depth_start": psc_start,
         "punch_sand_clay_depth_end": psc_end,
     }
 
 # ---------------- Master sweep with V4 enhancements ----------------
+# String columns of the envelope table hold a handful of distinct labels:
+# stored as pandas Categoricals (int8 codes), they compare and export as strings
+_GOV_LABELS = ["NA", "Clay-governed", "Sand-governed", "Clay-only", "Sand-only"]
+
+def _categorical_flag(flags: np.ndarray, no: str = "NO", yes: str = "YES") -> pd.Categorical:
+    return pd.Categorical.from_codes(flags.astype(np.int8), categories=[no, yes])
+
 def compute_envelopes(
     spud: Spudcan,
     layers: List[SoilLayer],
@@ -693,157 +1035,174 @@ def compute_envelopes(
     
     V4 Enhancement: Adds YES/NO columns for failure modes at each depth.
     """
-    n = int(np.floor(max_depth / dz)) + 1
-    depths = np.round(np.linspace(0.0, n*dz, n+1)[:n], 6)
-    out: Dict[str, list] = {
-        "depth": [],
-        "idle_clay_MN": [],
-        "idle_sand_MN": [],
-        "real_MN": [],
-        "gov": [],
-        "backflow": [],
-        "squeeze_MN": [],
-        "punch_MN": [],
-        "real_clay_only_MN": [],
-        "real_sand_only_MN": [],
-        # V4: New columns for failure mode indicators
-        "squeezing_active": [],
-        "punch_clay_clay_active": [],
-        "punch_sand_clay_active": [],
-    }
+    depths = _depth_grid(max_depth, dz)
+    n = depths.size
+    # Per-depth capacities (kN), filled in place; has_* marks where a check
+    # produced a value at all (None), since a produced value may itself be NaN
+    Fc_all, has_c = np.full(n, np.nan), np.zeros(n, dtype=bool)
+    Fsq_all, has_sq = np.full(n, np.nan), np.zeros(n, dtype=bool)
+    Fpt_all, has_pt = np.full(n, np.nan), np.zeros(n, dtype=bool)
+    # V4: failure mode indicators
+    squeezing_col = np.zeros(n, dtype=bool)
+    punch_cc_col = np.zeros(n, dtype=bool)
+    punch_sc_col = np.zeros(n, dtype=bool)
+
+    # Loop invariants
+    half_B = spud.B/2.0
+    n_layers = len(layers)
+    soil_code = _soil_codes(layers)
+    codes = soil_code.tolist()
+
+    # Meyerhof N depends on z/B only: one table lookup for the whole sweep
+    N_all = _meyerhof_N_all(depths / max(spud.B,1e-6), meyerhof_table)
+    above_tip = (depths < spud.tip_elev).tolist()
+    bearing_zero = 0.0 if spud.B > 0 and spud.A > 0 else None
+    # Owning layer of every depth (_layer_index semantics), resolved once
+    owner = _layer_owner(depths, layers)
+    owner_list = owner.tolist()
+
+    with _precomputed_profiles(layers, max_depth, depths, half_B):
+        # Backflow for the whole grid: z > N·cu_avg/γ'_avg over B/2 below each
+        # depth, where the owning layer has su there and a positive γ' average
+        su_here = _owner_profile_at(depths, owner, layers, "su")
+        su_here = np.isfinite(su_here) & (su_here > 0)
+        cu_avg = np.where(su_here, _owner_window_means(depths, owner, layers, "su"), np.nan)
+        gamma_avg = np.where(su_here, _owner_window_means(depths, owner, layers, "gamma"), np.nan)
+        ok = np.isfinite(cu_avg) & np.isfinite(gamma_avg) & (gamma_avg > 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            backflow_col = ok & (depths > (N_all * cu_avg) / gamma_avg)
+        backflow_list = backflow_col.tolist()
+        # Sand capacity has no per-depth branching on neighbours: one batched pass
+        Fs_all, has_s = sand_capacities(spud, depths, layers, apply_phi_reduction=phi_reduction)
+        Fs_list = Fs_all.tolist()
+        has_s_list = has_s.tolist()
+
+        for k, z in enumerate(depths.tolist()):
+            i = owner_list[k]
+            backflow = backflow_list[k]
 
-    for z in depths:
-        N = _meyerhof_N(z / max(spud.B,1e-6), meyerhof_table)
-        cu_avg = np.nan
-        gamma_avg = np.nan
-        if _has_su_here(z, layers):
-            i = _layer_index(z, layers)
-            cu_avg = _avg_over(z, z + spud.B/2.0, layers[i].su)
-            gamma_avg = _avg_over(z, z + spud.B/2.0, layers[i].gamma)
-        backflow = False
-        if np.isfinite(cu_avg) and np.isfinite(gamma_avg) and gamma_avg > 0:
-            backflow = z > (N * cu_avg) / gamma_avg
-
-        Fc = clay_capacity(spud, z, layers, use_min_cu=use_min_cu, backflow_zero=backflow)
-        Fs = sand_capacity(spud, z, layers, apply_phi_reduction=phi_reduction)
-
-        Fsq = squeeze_capacity(spud, z, layers, enforce_trigger=squeeze_trigger, backflow_zero=backflow)
-        Fpt = punchthrough_capacity(spud, z, layers, backflow_zero=backflow)
-
-        # V4: Track which failure modes are active at this depth
-        squeezing_active = "NO"
-        punch_cc_active = "NO"
-        punch_sc_active = "NO"
+            if above_tip[k]:
+                # Every capacity check returns 0.0 above the tip (clay first
+                # rejects a non-positive B or A)
+                Fc = bearing_zero
+                Fsq = Fpt = 0.0
+            else:
+                Fc = clay_capacity(spud, z, layers, use_min_cu=use_min_cu, backflow_zero=backflow)
+
+                Fsq = squeeze_capacity(spud, z, layers, enforce_trigger=squeeze_trigger, backflow_zero=backflow)
+                Fpt = punchthrough_capacity(spud, z, layers, backflow_zero=backflow)
+
+            Fs = Fs_list[k] if has_s_list[k] else None
+
+            # V4: Track which failure modes are active at this depth
+            if i + 1 < n_layers:
+                top, bot = layers[i], layers[i+1]
+                top_code = codes[i]
+                bot_clay = codes[i+1] <= _SOIL_SILT
         
-        idx = _layer_index(z, layers)
-        if idx + 1 < len(layers):
-            top, bot = layers[idx], layers[idx+1]
-            
-            # Check squeezing
-            if Fsq is not None and Fsq > 0:
-                squeezing_active = "YES"
-            
-            # Check punch-through clay/clay
-            if top.soil_type in ("clay","silt") and bot.soil_type in ("clay","silt"):
-                cu_t = _avg_over(z, z + spud.B/2.0, top.su)
-                cu_b = _avg_over(top.z_bot, top.z_bot + spud.B/2.0, bot.su)
-                if np.isfinite(cu_t) and np.isfinite(cu_b) and cu_t > cu_b:
-                    punch_cc_active = "YES"
-            
-            # Check punch-through sand/clay
-
-            # Check punch-through sand/clay
-            if top.soil_type == "sand" and bot.soil_type in ("clay","silt"):
-                H = top.z_bot - z
-                if H > 0 and Fpt is not None and Fpt > 0:
+                # Check squeezing
+                squeezing_col[k] = Fsq is not None and Fsq > 0
+        
+                # Check punch-through clay/clay
+                if bot_clay and top_code <= _SOIL_SILT:
+                    z_int = top.z_bot
+                    cu_t = _avg_over(z, z + half_B, top.su)
+                    cu_b = _avg_over(z_int, z_int + half_B, bot.su)
+                    punch_cc_col[k] = isfinite(cu_t) and isfinite(cu_b) and cu_t > cu_b
+        
+                # Check punch-through sand/clay
+                elif bot_clay and top_code == _SOIL_SAND:
+                    H = top.z_bot - z
                     # CRITICAL FIX: Only flag if punch capacity < sand capacity
                     # (indicates capacity DROP = actual punch-through risk)
-                    if Fs is not None and Fpt < Fs:
-                        punch_sc_active = "YES"
-                    else:
-                        punch_sc_active = "NO"  # Capacity stable/increases - no risk
-            #if top.soil_type == "sand" and bot.soil_type in ("clay","silt"):
-               # H = top.z_bot - z
-              #  if H > 0 and Fpt is not None and Fpt > 0:
-                   # punch_sc_active = "YES"
-
-        real_clay = None
-        if Fc is not None:
-            real_clay = Fc
+                    punch_sc_col[k] = (H > 0 and Fpt is not None and Fpt > 0
+                                       and Fs is not None and Fpt < Fs)
+
+            if Fc is not None:
+                Fc_all[k], has_c[k] = Fc, True
             if Fsq is not None:
-                real_clay = min(real_clay, Fsq)
-            if Fpt is not None and layers[_layer_index(z, layers)].soil_type != "sand":
-                real_clay = min(real_clay, Fpt)
-
-        real_sand = None
-        if Fs is not None:
-            real_sand = Fs
-            if Fpt is not None and layers[_layer_index(z, layers)].soil_type == "sand":
-                real_sand = min(real_sand, Fpt)
-
-        if windward_factor:
-            if real_clay is not None:
-                real_clay *= 0.8
-            if real_sand is not None:
-                real_sand *= 0.8
-
-        gov = ""
-        real = None
-        if (real_clay is not None) and (real_sand is not None):
-            if real_clay <= real_sand:
-                real = real_clay; gov = "Clay-governed"
-            else:
-                real = real_sand; gov = "Sand-governed"
-        elif real_clay is not None:
-            real = real_clay; gov = "Clay-only"
-        elif real_sand is not None:
-            real = real_sand; gov = "Sand-only"
-
-        out["depth"].append(z)
-        out["idle_clay_MN"].append(np.nan if Fc is None else Fc/1000.0)
-        out["idle_sand_MN"].append(np.nan if Fs is None else Fs/1000.0)
-        out["real_MN"].append(np.nan if real is None else real/1000.0)
-        out["gov"].append(gov if gov else "NA")
-        out["backflow"].append("Yes" if backflow else "No")
-        out["squeeze_MN"].append(np.nan if Fsq is None else Fsq/1000.0)
-        out["punch_MN"].append(np.nan if Fpt is None else Fpt/1000.0)
-        out["real_clay_only_MN"].append(np.nan if real_clay is None else real_clay/1000.0)
-        out["real_sand_only_MN"].append(np.nan if real_sand is None else real_sand/1000.0)
-        
-        # V4: Add failure mode indicators
-        out["squeezing_active"].append(squeezing_active)
-        out["punch_clay_clay_active"].append(punch_cc_active)
-        out["punch_sand_clay_active"].append(punch_sc_active)
+                Fsq_all[k], has_sq[k] = Fsq, True
+            if Fpt is not None:
+                Fpt_all[k], has_pt[k] = Fpt, True
+
+    # Real (reduced) capacities for all depths at once. Punch-through caps the
+    # clay envelope unless the depth sits in sand, where it caps the sand one.
+    # np.where(b < a, b, a) is Python's min(a, b), NaN handling included.
+    in_sand = (soil_code == _SOIL_SAND)[owner]
+    real_clay = np.where(has_c & has_sq & (Fsq_all < Fc_all), Fsq_all, Fc_all)
+    real_clay = np.where(has_c & has_pt & ~in_sand & (Fpt_all < real_clay), Fpt_all, real_clay)
+    real_sand = np.where(has_s & has_pt & in_sand & (Fpt_all < Fs_all), Fpt_all, Fs_all)
 
-    return pd.DataFrame(out)
+    # Windward leg: 0.8 on both envelopes (× 1.0 is exact, so no branch on the arrays)
+    windward = 0.8 if windward_factor else 1.0
+    real_clay *= windward
+    real_sand *= windward
+
+    both = has_c & has_s
+    clay_wins = both & (real_clay <= real_sand)
+    real = np.where(clay_wins | (has_c & ~has_s), real_clay, real_sand)
+    # Codes into _GOV_LABELS
+    gov = np.select([clay_wins, both, has_c, has_s], [1, 2, 3, 4], default=0).astype(np.int8)
+
+    # kN -> MN in place; a true division (not * 1e-3) keeps the values exact
+    for col in (Fc_all, Fs_all, real, Fsq_all, Fpt_all, real_clay, real_sand):
+        col /= 1000.0
+
+    return pd.DataFrame({
+        "depth": depths,
+        "idle_clay_MN": Fc_all,
+        "idle_sand_MN": Fs_all,
+        "real_MN": real,
+        "gov": pd.Categorical.from_codes(gov, categories=_GOV_LABELS),
+        "backflow": _categorical_flag(backflow_col, "No", "Yes"),
+        "squeeze_MN": Fsq_all,
+        "punch_MN": Fpt_all,
+        "real_clay_only_MN": real_clay,
+        "real_sand_only_MN": real_sand,
+        "squeezing_active": _categorical_flag(squeezing_col),
+        "punch_clay_clay_active": _categorical_flag(punch_cc_col),
+        "punch_sand_clay_active": _categorical_flag(punch_sc_col),
+    }, copy=False)
 
 # ---------------- Penetration utility ----------------
-def _penetration_for_load_MN(df: pd.DataFrame, col: str, load_MN: float) -> Optional[float]:
-    x = df[col].to_numpy(dtype=float)
-    z = df["depth"].to_numpy(dtype=float)
+def _penetrations_from_arrays(x: np.ndarray, z: np.ndarray, loads_MN) -> np.ndarray:
+    """
+    First depth at which capacity x reaches each of loads_MN (linear
+    interpolation), NaN for loads it never reaches.
+    """
     mask = np.isfinite(x)
     x = x[mask]; z = z[mask]
+    loads = np.asarray(loads_MN, dtype=float)
+    out = np.full(loads.shape, np.nan)
     if x.size < 2:
-        return None
-    if load_MN > x.max():
-        return None
-    j = np.where(x >= load_MN)[0]
-    if j.size == 0:
-        return None
-    j = j[0]
-    if j == 0:
-        return float(z[0])
-    x1, x2 = x[j-1], x[j]
-    z1, z2 = z[j-1], z[j]
-    if x2 == x1:
-        return float(z2)
-    return float(z1 + (load_MN - x1) * (z2 - z1) / (x2 - x1))
+        return out
+    # Capacity can drop (punch-through), but the first depth where x >= load
+    # is also the first where its running maximum does, which is sorted
+    j = np.searchsorted(np.maximum.accumulate(x), loads, side="left")
+    hit = j < x.size
+    jj = np.clip(j, 1, x.size - 1)
+    x1, x2 = x[jj-1], x[jj]
+    z1, z2 = z[jj-1], z[jj]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        vals = np.where(x2 == x1, z2, z1 + (loads - x1) * (z2 - z1) / (x2 - x1))
+    vals = np.where(j == 0, z[0], vals)
+    out[hit] = vals[hit]
+    return out
 
-def penetration_results(spud: Spudcan, df: pd.DataFrame) -> Dict[str, Optional[float]]:
-    """Returns analysis-depth and tip-penetration results (m)."""
+def _penetration_from_arrays(x: np.ndarray, z: np.ndarray, load_MN: float) -> Optional[float]:
+    """First depth at which capacity x reaches load_MN (linear interpolation)."""
+    z_pen = _penetrations_from_arrays(x, z, np.array([load_MN]))[0]
+    return None if np.isnan(z_pen) else float(z_pen)
+
+def _penetration_for_load_MN(df: pd.DataFrame, col: str, load_MN: float) -> Optional[float]:
+    return _penetration_from_arrays(df[col].to_numpy(dtype=float),
+                                    df["depth"].to_numpy(dtype=float), load_MN)
+
+def _penetration_results_from_arrays(spud: Spudcan, depth: np.ndarray, clay_MN: np.ndarray,
+                                     sand_MN: np.ndarray) -> Dict[str, Optional[float]]:
     P = spud.preload_MN
-    z_clay = _penetration_for_load_MN(df, "real_clay_only_MN", P)
-    z_sand = _penetration_for_load_MN(df, "real_sand_only_MN", P)
+    z_clay = _penetration_from_arrays(clay_MN, depth, P)
+    z_sand = _penetration_from_arrays(sand_MN, depth, P)
 
     res: Dict[str, Optional[float]] = {
         "z_clay": None if z_clay is None else float(z_clay),
@@ -862,3 +1221,34 @@ def penetration_results(spud: Spudcan, df: pd.DataFrame) -> Dict[str, Optional[f
         res["tip_range_min"] = res["z_range_min"] + spud.tip_elev
         res["tip_range_max"] = res["z_range_max"] + spud.tip_elev
     return res
+
+def penetration_results(spud: Spudcan, df: pd.DataFrame) -> Dict[str, Optional[float]]:
+    """Returns analysis-depth and tip-penetration results (m)."""
+    return _penetration_results_from_arrays(
+        spud,
+        df["depth"].to_numpy(dtype=float),
+        df["real_clay_only_MN"].to_numpy(dtype=float),
+        df["real_sand_only_MN"].to_numpy(dtype=float),
+    )
+
+def compute_envelopes_and_pen(
+    spud: Spudcan,
+    layers: List[SoilLayer],
+    max_depth: float,
+    **kwargs,
+) -> Tuple[pd.DataFrame, Dict[str, Optional[float]]]:
+    """
+    compute_envelopes() followed by penetration_results() in one call.
+    
+    The penetration search reads the freshly built float columns directly
+    instead of going back through the DataFrame. kwargs as for compute_envelopes().
+    """
+    df = compute_envelopes(spud, layers, max_depth, **kwargs)
+    depth = df["depth"].to_numpy(dtype=float)
+    pen = _penetration_results_from_arrays(
+        spud,
+        depth,
+        df["real_clay_only_MN"].to_numpy(dtype=float),
+        df["real_sand_only_MN"].to_numpy(dtype=float),
+    )
+    return df, pen
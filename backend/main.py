@@ -1,12 +1,29 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel
 from typing import List, Optional
 import pandas as pd
 import numpy as np
 import io
+import os
+import time
+import uuid
 import base64
-import matplotlib.pyplot as plt
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from operator import attrgetter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Optional: orjson encodes the large base64/CSV payloads ~10x faster
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 # --- Import your existing logic ---
 from lpa_v50_v4 import (
@@ -15,7 +32,17 @@ from lpa_v50_v4 import (
 from enhanced_penetration_prediction import analyze_penetration_enhanced
 from improved_plotting_v4 import plot_penetration_curve_v4, add_failure_mode_annotations
 
-app = FastAPI(title="Spud-SRI API", version="5.0")
+if ORJSON_AVAILABLE:
+    class ORJSONResponse(JSONResponse):
+        """JSON response rendered with orjson (NumPy scalars/arrays allowed)."""
+        def render(self, content) -> bytes:
+            return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+
+    DefaultResponse = ORJSONResponse
+else:
+    DefaultResponse = JSONResponse
+
+app = FastAPI(title="Spud-SRI API", version="5.0", default_response_class=DefaultResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -25,6 +52,61 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# The engine is pure-Python CPU work, so requests are computed in worker
+# processes (threads would serialise on the GIL). Created on first use so
+# that workers importing this module don't each start a pool of their own.
+CALC_WORKERS = os.cpu_count() or 1
+_executor: Optional[ProcessPoolExecutor] = None
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=CALC_WORKERS)
+    return _executor
+
+def _drop_executor(broken: ProcessPoolExecutor) -> None:
+    """
+    Forget a pool whose worker died (OOM, segfault); a broken pool fails every
+    later submit, so the next _get_executor() starts a fresh one. Concurrent
+    requests may all see the same breakage; only the first replaces the pool.
+    """
+    global _executor
+    if _executor is broken:
+        _executor = None
+    broken.shutdown(wait=False)
+
+# Rendered plot PNGs (base64) keyed by the plotted inputs; identical
+# requests skip the ~200 ms matplotlib render. The cache lives in each worker
+# process and the pool hands requests to whichever worker is free, so a repeat
+# only hits if it lands on a worker that served it before (about
+# 1/CALC_WORKERS for a single repeat, rising as every worker warms up).
+PLOT_CACHE_SIZE = 32
+PLOT_COLUMNS = ["depth", "real_MN", "squeezing_active",
+                "punch_clay_clay_active", "punch_sand_clay_active"]
+_plot_cache: "OrderedDict[str, str]" = OrderedDict()
+_plot_cache_lock = threading.Lock()
+
+# compute_envelopes() results keyed by the (point-sorted) request JSON; an
+# identical request, whatever its preload, skips the engine. Per worker
+# process, with the same hit-rate caveat as the plot cache.
+ENVELOPE_CACHE_SIZE = 64
+_envelope_cache: "OrderedDict[str, pd.DataFrame]" = OrderedDict()
+_envelope_cache_lock = threading.Lock()
+
+# CSV text of recent calculations, kept in the parent for the download
+# endpoint. Only touched from the event loop (async routes), so no lock is needed.
+JOB_TTL_S = 600
+JOB_CACHE_SIZE = 64
+_jobs: "OrderedDict[str, tuple]" = OrderedDict()  # job_id -> (expires_at, csv text)
+
+def _store_job(csv_text: str) -> str:
+    now = time.monotonic()
+    while _jobs and (len(_jobs) >= JOB_CACHE_SIZE or next(iter(_jobs.values()))[0] < now):
+        _jobs.popitem(last=False)
+    job_id = uuid.uuid4().hex
+    _jobs[job_id] = (now + JOB_TTL_S, csv_text)
+    return job_id
+
 # --- Data Models ---
 class SoilPointModel(BaseModel):
     z: float
@@ -61,87 +143,170 @@ class CalculationRequest(BaseModel):
     layers: List[SoilLayerInput]
     settings: AnalysisSettings
 
+def _plot_key(df: pd.DataFrame, spud: Spudcan) -> str:
+    """Hash of everything plot_penetration_curve_v4 + annotations draw."""
+    h = hashlib.blake2b(pd.util.hash_pandas_object(df[PLOT_COLUMNS], index=False).to_numpy().tobytes(),
+                        digest_size=16)
+    h.update(repr((spud.preload_MN, spud.tip_elev, spud.rig_name)).encode())
+    return h.hexdigest()
+
+def _plot_png_b64(df: pd.DataFrame, spud: Spudcan) -> str:
+    """Penetration plot as a base64 PNG, served from the LRU cache when possible."""
+    key = _plot_key(df, spud)
+    with _plot_cache_lock:
+        img_str = _plot_cache.get(key)
+        if img_str is not None:
+            _plot_cache.move_to_end(key)
+            return img_str
+
+    fig, ax = plot_penetration_curve_v4(
+        df=df,
+        preload_MN=spud.preload_MN,
+        tip_offset_m=spud.tip_elev,
+        rig_name=spud.rig_name,
+        fig_height=6,
+        fig_width=8
+    )
+    add_failure_mode_annotations(ax, df)
+
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", bbox_inches='tight', dpi=150) # Higher DPI for better look
+    img_str = base64.b64encode(buf.getvalue()).decode("utf-8")
+
+    with _plot_cache_lock:
+        _plot_cache[key] = img_str
+        while len(_plot_cache) > PLOT_CACHE_SIZE:
+            _plot_cache.popitem(last=False)
+    return img_str
+
+def _cached_envelopes(req: CalculationRequest, spud: Spudcan, layers: List[SoilLayer]) -> pd.DataFrame:
+    """compute_envelopes() for this request, from the LRU cache when possible (read-only)."""
+    key = req.model_dump_json(exclude={"spudcan": {"preload_MN"}})
+    with _envelope_cache_lock:
+        df = _envelope_cache.get(key)
+        if df is not None:
+            _envelope_cache.move_to_end(key)
+            return df
+
+    df = compute_envelopes(
+        spud=spud,
+        layers=layers,
+        max_depth=req.settings.max_depth,
+        dz=req.settings.dz,
+        use_min_cu=req.settings.use_min_cu,
+        phi_reduction=req.settings.phi_reduction,
+        windward_factor=req.settings.windward_factor,
+        squeeze_trigger=req.settings.squeeze_trigger
+    )
+
+    with _envelope_cache_lock:
+        _envelope_cache[key] = df
+        while len(_envelope_cache) > ENVELOPE_CACHE_SIZE:
+            _envelope_cache.popitem(last=False)
+    return df
+
+_BY_Z = attrgetter("z")
+
+def _run_calc(req: CalculationRequest, inline_csv: bool = True):
+    """Full calculation for one request; runs in a worker process."""
+    # 1. Reconstruct Inputs
+    internal_layers = []
+    for l in req.layers:
+        # Sort points by depth to be safe
+        l.gamma.sort(key=_BY_Z)
+        l.su.sort(key=_BY_Z)
+        l.phi.sort(key=_BY_Z)
+
+        internal_layers.append(SoilLayer(
+            name=l.name,
+            z_top=l.z_top,
+            z_bot=l.z_bot,
+            soil_type=l.soil_type,
+            gamma=[SoilPoint(p.z, p.v) for p in l.gamma],
+            su=[SoilPoint(p.z, p.v) for p in l.su],
+            phi=[SoilPoint(p.z, p.v) for p in l.phi]
+        ))
+
+    internal_spud = Spudcan(
+        rig_name=req.spudcan.rig_name,
+        B=req.spudcan.B,
+        A=req.spudcan.A,
+        tip_elev=req.spudcan.tip_elev,
+        preload_MN=req.spudcan.preload_MN,
+        beta=req.spudcan.beta,
+        alpha=req.spudcan.alpha
+    )
+
+    # 2. Run Math Engine
+    df = _cached_envelopes(req, internal_spud, internal_layers)
+
+    # 3. Run Predictions
+    prediction = analyze_penetration_enhanced(
+        df=df,
+        preload_MN=internal_spud.preload_MN,
+        tip_offset_m=internal_spud.tip_elev
+    )
+
+    # 4. Generate Plot
+    img_str = _plot_png_b64(df, internal_spud)
+
+    result = {
+        "prediction": {
+            "static_depth": prediction.static_depth,
+            "dynamic_range": prediction.final_range,
+            "design_depth": prediction.recommended_design_depth,
+            "warnings": prediction.warnings
+        },
+        "plot_image": img_str
+    }
+
+    # 5. Generate CSV (Server-Side). Only the text goes back to the parent, not
+    # the table; inline, it is the same object, so it is pickled once.
+    csv_text = df.to_csv(index=False)
+    if inline_csv:
+        result["csv_data"] = csv_text  # <-- NEW: Sending the file directly
+
+    return result, csv_text
+
 @app.post("/calculate-penetration")
-def calculate_penetration(req: CalculationRequest):
+async def calculate_penetration(req: CalculationRequest, inline_csv: bool = True):
+    """
+    Run the analysis. The result table can be downloaded from ``csv_url``
+    for JOB_TTL_S seconds; pass ``inline_csv=false`` to leave the CSV text
+    out of the JSON body.
+    """
     try:
-        # 1. Reconstruct Inputs
-        internal_layers = []
-        for l in req.layers:
-            # Sort points by depth to be safe
-            l.gamma.sort(key=lambda p: p.z)
-            l.su.sort(key=lambda p: p.z)
-            l.phi.sort(key=lambda p: p.z)
-
-            internal_layers.append(SoilLayer(
-                name=l.name,
-                z_top=l.z_top,
-                z_bot=l.z_bot,
-                soil_type=l.soil_type,
-                gamma=[SoilPoint(p.z, p.v) for p in l.gamma],
-                su=[SoilPoint(p.z, p.v) for p in l.su],
-                phi=[SoilPoint(p.z, p.v) for p in l.phi]
-            ))
-
-        internal_spud = Spudcan(
-            rig_name=req.spudcan.rig_name,
-            B=req.spudcan.B,
-            A=req.spudcan.A,
-            tip_elev=req.spudcan.tip_elev,
-            preload_MN=req.spudcan.preload_MN,
-            beta=req.spudcan.beta,
-            alpha=req.spudcan.alpha
-        )
-
-        # 2. Run Math Engine
-        df = compute_envelopes(
-            spud=internal_spud,
-            layers=internal_layers,
-            max_depth=req.settings.max_depth,
-            dz=req.settings.dz,
-            use_min_cu=req.settings.use_min_cu,
-            phi_reduction=req.settings.phi_reduction,
-            windward_factor=req.settings.windward_factor,
-            squeeze_trigger=req.settings.squeeze_trigger
-        )
-
-        # 3. Run Predictions
-        prediction = analyze_penetration_enhanced(
-            df=df,
-            preload_MN=internal_spud.preload_MN,
-            tip_offset_m=internal_spud.tip_elev
-        )
-
-        # 4. Generate Plot
-        fig, ax = plot_penetration_curve_v4(
-            df=df,
-            preload_MN=internal_spud.preload_MN,
-            tip_offset_m=internal_spud.tip_elev,
-            rig_name=internal_spud.rig_name,
-            fig_height=6,
-            fig_width=8
-        )
-        add_failure_mode_annotations(ax, df)
-
-        buf = io.BytesIO()
-        fig.savefig(buf, format="png", bbox_inches='tight', dpi=150) # Higher DPI for better look
-        buf.seek(0)
-        img_str = base64.b64encode(buf.read()).decode("utf-8")
-        plt.close(fig)
-
-        # 5. Generate CSV (Server-Side)
-        csv_string = df.to_csv(index=False)
-
-        return {
-            "prediction": {
-                "static_depth": prediction.static_depth,
-                "dynamic_range": prediction.final_range,
-                "design_depth": prediction.recommended_design_depth,
-                "warnings": prediction.warnings
-            },
-            "plot_image": img_str,
-            "csv_data": csv_string  # <-- NEW: Sending the file directly
-        }
+        loop = asyncio.get_running_loop()
+        for attempt in range(2):
+            executor = _get_executor()
+            try:
+                result, csv_text = await loop.run_in_executor(executor, _run_calc, req, inline_csv)
+                break
+            except BrokenProcessPool:
+                # A worker died; retry once on a fresh pool
+                _drop_executor(executor)
+                if attempt:
+                    raise HTTPException(status_code=503,
+                                        detail="Calculation workers unavailable, please retry")
+        job_id = _store_job(csv_text)
+        result["job_id"] = job_id
+        result["csv_url"] = f"/calculate-penetration/{job_id}/csv"
+        return result
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/calculate-penetration/{job_id}/csv")
+async def download_csv(job_id: str):
+    job = _jobs.get(job_id)
+    if job is None or job[0] < time.monotonic():
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    return Response(
+        content=job[1],
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="penetration_{job_id}.csv"'}
+    )
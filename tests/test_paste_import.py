@@ -0,0 +1,34 @@
+"""
+Pasted-CSV layer import in the enhanced input widget (app_ui_v2.py), driven
+through Streamlit's AppTest.
+"""
+from pathlib import Path
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+APP = str(Path(__file__).resolve().parents[1] / "app_ui_v2.py")
+
+
+def _paste(text: str) -> AppTest:
+    at = AppTest.from_file(APP, default_timeout=120)
+    at.run()
+    at.radio[0].set_value("Enhanced Interactive (Multiple Points)").run()
+    at.text_area[0].set_value(text).run()
+    return at
+
+
+@pytest.mark.parametrize("text", ["hello", "a,b,c", "Clay, clay, 0, 10", "x,y\n,,,,"])
+def test_short_or_garbage_lines_parse_to_no_layers(text):
+    at = _paste(text)
+    assert not at.exception
+    assert [e.value for e in at.error] == []
+    assert [s.value for s in at.success] == ["Parsed 0 layers"]
+
+
+def test_valid_lines_parse_and_short_lines_are_skipped():
+    at = _paste("Soft Clay, clay, 0, 10, su, 0, 20, 10, 40\n"
+                "Sand, sand, 10, 20, phi, 10, 32, 20, 35\n"
+                "bad line")
+    assert not at.exception
+    assert [s.value for s in at.success] == ["Parsed 2 layers"]